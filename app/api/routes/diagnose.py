@@ -1,13 +1,15 @@
 import uuid
+import gzip
 import json
 from pathlib import Path
 from datetime import datetime
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Header
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Header, Request
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.schemas import DiagnoseRequest, DiagnoseResponse, CaseSummary, CaseListResponse
+from app.api.schemas import SUPPORTED_CROPS, DiagnoseRequest, DiagnoseResponse, CaseSummary, CaseListResponse
 from app.services.orchestrator import PipelineOrchestrator
+from app.services.storage import find_case_dir
 from app.core.config import settings
 
 # Optional database import
@@ -28,6 +30,16 @@ async def get_db_if_enabled():
         yield None
 
 
+def get_orchestrator(request: Request) -> PipelineOrchestrator:
+    """Dependency that returns the orchestrator created on application startup."""
+    orchestrator = getattr(request.app.state, "orchestrator", None)
+    if orchestrator is None:
+        # App served without lifespan events (e.g. TestClient outside `with`)
+        orchestrator = PipelineOrchestrator()
+        request.app.state.orchestrator = orchestrator
+    return orchestrator
+
+
 router = APIRouter(tags=["diagnose"])
 
 
@@ -40,6 +52,7 @@ async def diagnose(
     lon: Optional[float] = Form(None),
     images: Optional[List[UploadFile]] = File(None),
     db: Optional[AsyncSession] = Depends(get_db_if_enabled),
+    orchestrator: PipelineOrchestrator = Depends(get_orchestrator),
     x_use_rekognition: Optional[str] = Header(None, alias="X-Use-Rekognition"),
     x_use_bedrock: Optional[str] = Header(None, alias="X-Use-Bedrock"),
 ):
@@ -75,8 +88,7 @@ async def diagnose(
     if x_use_bedrock is not None:
         use_bedrock = x_use_bedrock.lower() == "true"
 
-    # Initialize orchestrator and run pipeline
-    orchestrator = PipelineOrchestrator()
+    # Run pipeline (orchestrator is shared, created on startup)
     result = await orchestrator.run_pipeline(
         req,
         images or [],
@@ -152,18 +164,13 @@ async def get_case(
             pass  # Fall back to filesystem
 
     # Search for case in date-partitioned directory structure
-    cases_root = Path(settings.DATA_ROOT) / "cases"
-
-    if not cases_root.exists():
-        raise HTTPException(status_code=404, detail="No cases found")
-
-    # Search all date directories for the case_id
+    # (response.json.gz since compressed persistence, response.json before)
     response_path = None
-    for date_dir in cases_root.iterdir():
-        if date_dir.is_dir():
-            candidate_path = date_dir / case_id / "response.json"
-            if candidate_path.exists():
-                response_path = candidate_path
+    case_dir = find_case_dir(case_id)
+    if case_dir is not None:
+        for name in ("response.json.gz", "response.json"):
+            if (case_dir / name).exists():
+                response_path = case_dir / name
                 break
 
     if not response_path:
@@ -174,7 +181,8 @@ async def get_case(
 
     # Load and validate response
     try:
-        with open(response_path, "r", encoding="utf-8") as f:
+        opener = gzip.open if response_path.suffix == ".gz" else open
+        with opener(response_path, "rt", encoding="utf-8") as f:
             data = json.load(f)
 
         # Validate it matches our schema
@@ -197,14 +205,18 @@ async def get_case(
 async def list_cases(
     date: Optional[str] = None,
     limit: int = 50,
+    search: Optional[str] = None,
+    crop: Optional[str] = None,
     db: Optional[AsyncSession] = Depends(get_db_if_enabled)
 ):
     """
-    List all diagnosis cases, optionally filtered by date.
+    List all diagnosis cases, optionally filtered by date, symptoms text and crop.
 
     Args:
         date: Optional ISO date filter (YYYY-MM-DD)
         limit: Maximum number of cases to return (default 50)
+        search: Optional case-insensitive substring of the symptoms text
+        crop: Optional exact crop filter
         db: Optional database session
 
     Returns:
@@ -232,7 +244,15 @@ async def list_cases(
                 except ValueError:
                     raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
 
-            log.info(f"Executing query for cases (limit={limit}, date={date})")
+            if search:
+                # ILIKE on the raw column so Postgres can use the gin_trgm_ops
+                # index (idx_symptoms_text_gin); lower(...) LIKE could not
+                escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                stmt = stmt.where(DiagnosisCase.symptoms_text.ilike(f"%{escaped}%", escape="\\"))
+            if crop:
+                stmt = stmt.where(DiagnosisCase.crop == crop)
+
+            log.info(f"Executing query for cases (limit={limit}, date={date}, search={search!r}, crop={crop})")
             result = await db.execute(stmt)
             cases_db = result.scalars().all()
             log.info(f"Query returned {len(cases_db)} cases from database")
@@ -260,24 +280,27 @@ async def list_cases(
             pass  # Fall back to filesystem
 
     # Fallback to filesystem
+    if date:
+        # Validate date format
+        try:
+            datetime.fromisoformat(date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
     cases_root = Path(settings.DATA_ROOT) / "cases"
 
     if not cases_root.exists():
         return CaseListResponse(cases=[], total=0)
 
     summaries = []
+    search_lc = search.lower() if search else None
 
     # Determine which date directories to scan
     date_dirs = []
     if date:
-        # Validate date format
-        try:
-            datetime.fromisoformat(date)
-            target_dir = cases_root / date
-            if target_dir.exists():
-                date_dirs = [target_dir]
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        target_dir = cases_root / date
+        if target_dir.exists():
+            date_dirs = [target_dir]
     else:
         # Scan all date directories
         date_dirs = [d for d in cases_root.iterdir() if d.is_dir()]
@@ -299,11 +322,18 @@ async def list_cases(
                 with open(request_file, "r", encoding="utf-8") as f:
                     req_data = json.load(f)
 
+                case_crop = req_data.get("crop", "unknown")
+                symptoms_text = req_data.get("symptoms_text", "")
+                if crop and case_crop != crop:
+                    continue
+                if search_lc and search_lc not in symptoms_text.lower():
+                    continue
+
                 summaries.append(CaseSummary(
                     case_id=case_dir.name,
                     date=date_dir.name,
-                    crop=req_data.get("crop", "unknown"),
-                    symptoms_preview=req_data.get("symptoms_text", "")[:100]
+                    crop=case_crop,
+                    symptoms_preview=symptoms_text[:100]
                 ))
 
                 if len(summaries) >= limit:
@@ -313,3 +343,9 @@ async def list_cases(
                 continue  # Skip corrupted cases
 
     return CaseListResponse(cases=summaries, total=len(summaries))
+
+
+@router.get("/meta/crops", response_model=List[str])
+def list_supported_crops():
+    """Return the crops accepted by /v1/diagnose, sorted by name."""
+    return sorted(SUPPORTED_CROPS)
@@ -11,13 +11,14 @@ class Settings:
 
         self.MAX_IMAGES = int(os.getenv("AGRO_MAX_IMAGES", os.getenv("MAX_IMAGES", "4")))
         self.MAX_IMAGE_MB = int(os.getenv("AGRO_MAX_IMAGE_MB", os.getenv("MAX_IMAGE_MB", "5")))
-        self.ALLOWED_MIME = (
-            os.getenv(
+        # Frozenset: checked once per uploaded image
+        self.ALLOWED_MIME = frozenset(
+            mime.strip().lower()
+            for mime in os.getenv(
                 "AGRO_ALLOWED_MIME",
                 os.getenv("ALLOWED_MIME", "image/jpeg,image/png,image/webp"),
-            )
-            .strip()
-            .split(",")
+            ).split(",")
+            if mime.strip()
         )
 
         self.RAG_MODE = os.getenv("AGRO_RAG_MODE", os.getenv("RAG_MODE", "tfidf")).lower()
@@ -3,11 +3,37 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 import logging
 import traceback
+from contextlib import asynccontextmanager
 from pydantic import ValidationError as PydanticValidationError
 from app.api.routes.diagnose import router as diagnose_router
+from app.core.config import settings
+from app.services.orchestrator import PipelineOrchestrator
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open long-lived clients on startup and release them on shutdown."""
+    # Services (CV, KB retriever, LLM) are built once, not per request
+    app.state.orchestrator = PipelineOrchestrator()
+
+    app.state.s3_client = None
+    if settings.USE_S3:
+        try:
+            from app.services.storage.s3_service import open_s3_client_async
+            app.state.s3_client = await open_s3_client_async()
+        except Exception as e:
+            logger.warning(f"S3 client not opened on startup: {e}")
+
+    yield
+
+    if app.state.s3_client is not None:
+        from app.services.storage.s3_service import close_s3_client_async
+        await close_s3_client_async()
+        app.state.s3_client = None
+
+
 app = FastAPI(
     title="AgroDiag",
     version="1.0.0",
@@ -19,6 +45,7 @@ app = FastAPI(
     license_info={
         "name": "Proprietary",
     },
+    lifespan=lifespan,
 )
 
 
@@ -31,7 +31,7 @@ class RulesHelper:
             kb_cards: Disease cards from RAGRetriever
 
         Returns:
-            Filtered and scored disease cards
+            Filtered and scored disease cards (copies; input cards are not modified)
         """
         filtered_cards = []
 
@@ -68,8 +68,7 @@ class RulesHelper:
             # ─────────────────────────────────────────────────────
             # RULE 4: Normalization
             # ─────────────────────────────────────────────────────
-            card["_rule_score"] = min(score, 1.0)
-            filtered_cards.append(card)
+            filtered_cards.append({**card, "_rule_score": min(score, 1.0)})
 
         # Sort by rule score (descending)
         return sorted(filtered_cards, key=lambda x: x["_rule_score"], reverse=True)
@@ -138,7 +138,8 @@ class LLMClient:
                 "score": round(min(max(score, 0.0), 1.0), 3),
                 "rationale": rationale,
                 "kb_refs": [{"id": card["id"], "name": card["name"]}],
-                "actions": card.get("actions", {}),
+                # Copied: Bedrock enrichment adds keys, KB cards stay untouched
+                "actions": dict(card.get("actions") or {}),
             })
 
         # Sort by score (descending)
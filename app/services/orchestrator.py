@@ -10,8 +10,10 @@ Coordinates the 6-stage diagnosis process:
 6. Persistence (filesystem/database/S3)
 """
 import os
+import gzip
 import json
 import time
+import asyncio
 import uuid
 from datetime import datetime
 from pathlib import Path
@@ -37,9 +39,13 @@ from app.services.cv_service import CVService
 from app.services.rag_retriever import RAGRetriever
 from app.services.llm_client import LLMClient
 from app.services.helpers.rules_helper import RulesHelper
+from app.services.storage import case_dir_for
 
 logger = logging.getLogger(__name__)
 
+# Characters replaced with "_" in uploaded filenames
+_SAFE_FILENAME_TABLE = str.maketrans({c: "_" for c in '<>:"/\\|?*'})
+
 
 class PipelineOrchestrator:
     """
@@ -121,59 +127,88 @@ class PipelineOrchestrator:
 
         img_meta, images_bytes, exif_list = await self._preprocess_images(images)
 
-        # ═══════════════════════════════════════════════════════
-        # STAGE 1: Computer Vision
-        # ═══════════════════════════════════════════════════════
-
-        t_cv0 = time.perf_counter()
-        visual_features = await self.cv_service.extract_features(
-            images,
-            req.symptoms_text,
-            images_bytes=images_bytes,
-            use_rekognition=use_rekognition
-        )
-        t_cv1 = time.perf_counter()
-
-        logger.info(f"CV extracted {len(visual_features)} features in {t_cv1 - t_cv0:.2f}s")
+        # With S3 enabled, images go straight to the bucket while the
+        # pipeline runs; no local copy is written.
+        s3_task = None
+        if settings.USE_S3 and images_bytes:
+            s3_task = asyncio.create_task(
+                self._upload_images_s3(case_id, img_meta, images_bytes)
+            )
 
-        # ═══════════════════════════════════════════════════════
-        # STAGE 2: Knowledge Base Retrieval
-        # ═══════════════════════════════════════════════════════
+        # Stages 1-4 can raise (e.g. HTTPException); don't leave the upload
+        # running for a case that will never be saved, nor a stage-1 task
+        # orphaned when its sibling fails.
+        stage_tasks = [s3_task] if s3_task is not None else []
+        try:
+            # ═══════════════════════════════════════════════════════
+            # STAGE 1: Computer Vision (overlapped with KB card loading)
+            # ═══════════════════════════════════════════════════════
+
+            # KB YAML loading doesn't depend on CV output, so it runs in a
+            # worker thread while features are extracted.
+            cv_task = asyncio.create_task(self._timed(
+                self.cv_service.extract_features(
+                    images,
+                    req.symptoms_text,
+                    images_bytes=images_bytes,
+                    use_rekognition=use_rekognition
+                )
+            ))
+            kb_task = asyncio.create_task(self._timed(
+                asyncio.to_thread(self.rag_retriever.load_cards, req.crop)
+            ))
+            stage_tasks += [cv_task, kb_task]
+            (visual_features, cv_time), (crop_cards, kb_load_time) = await asyncio.gather(cv_task, kb_task)
+
+            logger.info(f"CV extracted {len(visual_features)} features in {cv_time:.2f}s")
+
+            # ═══════════════════════════════════════════════════════
+            # STAGE 2: Knowledge Base Retrieval
+            # ═══════════════════════════════════════════════════════
+
+            t_ret0 = time.perf_counter()
+            kb_cards = await self.rag_retriever.retrieve(
+                req.crop,
+                req.symptoms_text,
+                visual_features,
+                cards=crop_cards
+            )
+            ret_time = kb_load_time + (time.perf_counter() - t_ret0)
 
-        t_ret0 = time.perf_counter()
-        kb_cards = await self.rag_retriever.retrieve(
-            req.crop,
-            req.symptoms_text,
-            visual_features
-        )
-        t_ret1 = time.perf_counter()
+            logger.info(f"RAG retrieved {len(kb_cards)} candidates in {ret_time:.2f}s")
 
-        logger.info(f"RAG retrieved {len(kb_cards)} candidates in {t_ret1 - t_ret0:.2f}s")
+            # ═══════════════════════════════════════════════════════
+            # STAGE 3: Rules Engine
+            # ═══════════════════════════════════════════════════════
 
-        # ═══════════════════════════════════════════════════════
-        # STAGE 3: Rules Engine
-        # ═══════════════════════════════════════════════════════
+            t_rules0 = time.perf_counter()
+            rule_adjusted = self.rules_helper.apply_rules(
+                req.crop,
+                req.growth_stage,
+                visual_features,
+                kb_cards
+            )
+            t_rules1 = time.perf_counter()
 
-        t_rules0 = time.perf_counter()
-        rule_adjusted = self.rules_helper.apply_rules(
-            req.crop,
-            req.growth_stage,
-            visual_features,
-            kb_cards
-        )
-        t_rules1 = time.perf_counter()
+            logger.info(f"Rules filtered to {len(rule_adjusted)} candidates in {t_rules1 - t_rules0:.2f}s")
 
-        logger.info(f"Rules filtered to {len(rule_adjusted)} candidates in {t_rules1 - t_rules0:.2f}s")
+            # ═══════════════════════════════════════════════════════
+            # STAGE 4: LLM Ranking & Reasoning
+            # ═══════════════════════════════════════════════════════
 
-        # ═══════════════════════════════════════════════════════
-        # STAGE 4: LLM Ranking & Reasoning
-        # ═══════════════════════════════════════════════════════
+            t_rank0 = time.perf_counter()
+            ranked = await self.llm_client.rank_and_reason(req, rule_adjusted, use_bedrock=use_bedrock)
+            t_rank1 = time.perf_counter()
 
-        t_rank0 = time.perf_counter()
-        ranked = await self.llm_client.rank_and_reason(req, rule_adjusted, use_bedrock=use_bedrock)
-        t_rank1 = time.perf_counter()
+            logger.info(f"LLM ranked {len(ranked)} candidates in {t_rank1 - t_rank0:.2f}s")
+        except BaseException:
+            for task in stage_tasks:
+                task.cancel()
+            await asyncio.gather(*stage_tasks, return_exceptions=True)
+            raise
 
-        logger.info(f"LLM ranked {len(ranked)} candidates in {t_rank1 - t_rank0:.2f}s")
+        if s3_task is not None:
+            await s3_task
 
         # ═══════════════════════════════════════════════════════
         # STAGE 5: Response Assembly
@@ -184,8 +219,8 @@ class PipelineOrchestrator:
             ranked,
             visual_features,
             t0,
-            t_cv1 - t_cv0,
-            t_ret1 - t_ret0,
+            cv_time,
+            ret_time,
             t_rules1 - t_rules0,
             t_rank1 - t_rank0
         )
@@ -212,6 +247,14 @@ class PipelineOrchestrator:
         return response
 
 
+    @staticmethod
+    async def _timed(awaitable):
+        """Await and return (result, elapsed seconds)."""
+        t_start = time.perf_counter()
+        result = await awaitable
+        return result, time.perf_counter() - t_start
+
+
     async def _preprocess_images(
         self,
         images: List[UploadFile]
@@ -236,7 +279,7 @@ class PipelineOrchestrator:
             )
 
         img_meta, images_bytes, exif_list = [], [], []
-        allowed_mime = set(settings.ALLOWED_MIME)
+        allowed_mime = settings.ALLOWED_MIME
         max_image_bytes = settings.MAX_IMAGE_MB * 1024 * 1024
 
         for i, f in enumerate(images or []):
@@ -275,6 +318,40 @@ class PipelineOrchestrator:
         return img_meta, images_bytes, exif_list
 
 
+    async def _upload_images_s3(
+        self,
+        case_id: str,
+        img_meta: List[Dict],
+        images_bytes: List[bytes]
+    ) -> None:
+        """
+        Upload images to S3 concurrently.
+
+        On success each metadata dict gets "s3_url" and "s3_key"; images that
+        failed to upload keep no S3 reference and are stored locally instead.
+
+        Args:
+            case_id: Case UUID string
+            img_meta: Image metadata (updated in place)
+            images_bytes: Image bytes
+        """
+        from app.services.storage.s3_service import upload_image_async
+
+        results = await asyncio.gather(
+            *[
+                upload_image_async(case_id, meta["filename"], img_bytes, meta["content_type"])
+                for meta, img_bytes in zip(img_meta, images_bytes)
+            ],
+            return_exceptions=True
+        )
+
+        for meta, result in zip(img_meta, results):
+            if isinstance(result, Exception):
+                logger.warning(f"S3 upload failed for {meta['filename']}: {result}")
+                continue
+            meta["s3_url"], meta["s3_key"] = result
+
+
     def _assemble_response(
         self,
         case_id: str,
@@ -302,30 +379,33 @@ class PipelineOrchestrator:
         Returns:
             Complete DiagnoseResponse
         """
+        # Ranked items come from LLMClient (scores already clamped to [0, 1]),
+        # so models are built with model_construct() and skip re-validation.
+
         # Build candidates (top 3)
-        candidates = [
-            Candidate(
+        candidates = []
+        for it in ranked[:3]:
+            kb_refs = []
+            for ref in it.get("kb_refs", []):
+                ref_id = ref["id"]
+                kb_refs.append(KBRef.model_construct(id=ref_id, title=ref.get("name", ref_id)))
+
+            candidates.append(Candidate.model_construct(
                 disease=it["name"],
                 score=it["score"],
                 rationale=it["rationale"],
-                kb_refs=[
-                    KBRef(id=ref["id"], title=ref.get("name", ref["id"]))
-                    for ref in it.get("kb_refs", [])
-                ],
-            )
-            for it in ranked[:3]
-        ]
+                kb_refs=kb_refs,
+            ))
 
         # Build action plan from top candidate
-        plan = ActionPlan()
-        if ranked:
-            top_actions = ranked[0].get("actions", {})
-            plan = ActionPlan(
-                diagnostics=top_actions.get("diagnostics", []),
-                agronomy=top_actions.get("agronomy", []),
-                chemical=top_actions.get("chemical", []),
-                bio=top_actions.get("bio", []),
-            )
+        top_actions = (ranked[0].get("actions") or {}) if ranked else {}
+        # KB actions are frozen tuples; the plan fields are lists
+        plan = ActionPlan.model_construct(
+            diagnostics=list(top_actions.get("diagnostics", ())),
+            agronomy=list(top_actions.get("agronomy", ())),
+            chemical=list(top_actions.get("chemical", ())),
+            bio=list(top_actions.get("bio", ())),
+        )
 
         # Disclaimers
         disclaimers = [
@@ -423,15 +503,17 @@ class PipelineOrchestrator:
         visual_features: Dict
     ):
         """Save case data to filesystem (legacy mode)."""
-        data_root = settings.DATA_ROOT
         date_str = datetime.now().date().isoformat()
-        workspace = os.path.join(data_root, "cases", date_str, case_id)
-        os.makedirs(os.path.join(workspace, "images"), exist_ok=True)
+        workspace = str(case_dir_for(case_id, date_str))
+        images_dir = os.path.join(workspace, "images")
+        os.makedirs(workspace if settings.USE_S3 else images_dir, exist_ok=True)
 
-        # Save images
+        # Save images (skipped for images already stored in S3)
         for meta, img_bytes in zip(img_meta, images_bytes):
-            fname = meta["filename"]
-            with open(os.path.join(workspace, "images", fname), "wb") as out:
+            if meta.get("s3_key"):
+                continue
+            os.makedirs(images_dir, exist_ok=True)
+            with open(os.path.join(images_dir, meta["filename"]), "wb") as out:
                 out.write(img_bytes)
 
         # Save request
@@ -440,8 +522,8 @@ class PipelineOrchestrator:
         with open(os.path.join(workspace, "request.json"), "w", encoding="utf-8") as fw:
             json.dump(req_dump, fw, ensure_ascii=False, indent=2)
 
-        # Save trace
-        with open(os.path.join(workspace, "trace.json"), "w", encoding="utf-8") as fw:
+        # Save trace and response gzip-compressed (level 1: fast, most of the gain)
+        with gzip.open(os.path.join(workspace, "trace.json.gz"), "wt", encoding="utf-8", compresslevel=1) as fw:
             json.dump(
                 {
                     "visual_features": visual_features,
@@ -452,8 +534,7 @@ class PipelineOrchestrator:
                 fw, ensure_ascii=False, indent=2
             )
 
-        # Save response
-        with open(os.path.join(workspace, "response.json"), "w", encoding="utf-8") as fw:
+        with gzip.open(os.path.join(workspace, "response.json.gz"), "wt", encoding="utf-8", compresslevel=1) as fw:
             json.dump(resp.model_dump(), fw, ensure_ascii=False, indent=2)
 
         logger.info(f"Saved case {case_id} to filesystem: {workspace}")
@@ -492,17 +573,8 @@ class PipelineOrchestrator:
 
             # Save images
             for meta, img_bytes, exif in zip(img_meta, images_bytes, exif_list):
-                # Upload to S3 if enabled
-                s3_url, s3_key = None, None
-                if settings.USE_S3:
-                    try:
-                        from app.services.helpers.storage_helper import StorageHelper
-                        storage = StorageHelper()
-                        s3_url, s3_key = await storage.upload_image_async(
-                            str(case_uuid), meta["filename"], img_bytes, meta["content_type"]
-                        )
-                    except Exception as e:
-                        logger.warning(f"S3 upload failed: {e}, storing in DB")
+                # S3 upload already happened during the pipeline (if enabled)
+                s3_url, s3_key = meta.get("s3_url"), meta.get("s3_key")
 
                 await DiagnosisImageRepository.create(
                     db=db,
@@ -528,10 +600,7 @@ class PipelineOrchestrator:
     @staticmethod
     def _safe_filename(name: str) -> str:
         """Sanitize filename to prevent path traversal."""
-        bad = '<>:"/\\|?*'
-        for ch in bad:
-            name = name.replace(ch, "_")
-        return name.strip() or "file"
+        return name.translate(_SAFE_FILENAME_TABLE).strip() or "file"
 
 
     @staticmethod
@@ -7,10 +7,10 @@ Retrieves relevant disease candidates from the knowledge base using:
 - Rekognition confidence boosting
 """
 import os
-import glob
 import yaml
 import math
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,6 +26,24 @@ KEYWORDS = [
 ]
 
 
+def _freeze(value):
+    """Recursively convert dicts to read-only mappings and lists to tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _iter_yaml(crop_dir: str) -> List[str]:
+    """List YAML card paths in a crop directory with a single scandir pass."""
+    try:
+        with os.scandir(crop_dir) as it:
+            return [e.path for e in it if e.name.endswith(".yaml") and e.is_file()]
+    except FileNotFoundError:
+        return []
+
+
 class RAGRetriever:
     """
     RAG Retriever Service for searching the knowledge base.
@@ -48,7 +66,8 @@ class RAGRetriever:
         self,
         crop: str,
         symptoms_text: str,
-        features: Dict[str, float]
+        features: Dict[str, float],
+        cards: Optional[List[Mapping]] = None
     ) -> List[Dict]:
         """
         Retrieve and rank disease candidates from knowledge base.
@@ -57,6 +76,7 @@ class RAGRetriever:
             crop: Crop name (e.g., "tomato", "potato")
             symptoms_text: User-provided symptom description
             features: Extracted visual features from CVService
+            cards: Cards already loaded with load_cards() (loaded here if None)
 
         Returns:
             List of disease cards sorted by relevance score (descending)
@@ -77,24 +97,41 @@ class RAGRetriever:
         logger.info(f"Retrieving KB for crop={crop}, features={len(features)} keys")
 
         # Load disease cards for the specified crop
-        cards = self._load_kb_cards(crop)
+        if cards is None:
+            cards = self._load_kb_cards(crop)
 
         if not cards:
             logger.warning(f"No disease cards found for crop: {crop}")
             return []
 
-        # Score each card
-        for card in cards:
-            card["_score"] = self._score_card(symptoms_text, features, card)
+        # Keywords present in the query are matched once, not per card
+        text_lower = symptoms_text.lower()
+        text_keywords = frozenset(k for k in KEYWORDS if k in text_lower)
+
+        # Score each card (loaded cards are read-only; scores go on copies)
+        scored = [
+            {**card, "_score": self._score_card(text_keywords, features, card)}
+            for card in cards
+        ]
 
         # Sort by score (descending)
-        sorted_cards = sorted(cards, key=lambda x: x["_score"], reverse=True)
+        sorted_cards = sorted(scored, key=lambda x: x["_score"], reverse=True)
 
         logger.info(f"Retrieved {len(sorted_cards)} candidates, top score: {sorted_cards[0]['_score']:.3f}")
         return sorted_cards
 
 
-    def _load_kb_cards(self, crop: str) -> List[Dict]:
+    def load_cards(self, crop: str) -> List[Mapping]:
+        """
+        Load disease cards for a crop without scoring them.
+
+        Blocking (disk + YAML); the orchestrator runs it in a worker thread
+        alongside CV feature extraction.
+        """
+        return self._load_kb_cards(crop)
+
+
+    def _load_kb_cards(self, crop: str) -> List[Mapping]:
         """
         Load all disease YAML files for a given crop.
 
@@ -102,12 +139,11 @@ class RAGRetriever:
             crop: Crop name (e.g., "tomato")
 
         Returns:
-            List of disease dictionaries
+            List of read-only disease card mappings (nested lists are tuples)
         """
-        pattern = os.path.join(self.kb_root, crop, "*.yaml")
         cards = []
 
-        for path in glob.glob(pattern):
+        for path in _iter_yaml(os.path.join(self.kb_root, crop)):
             try:
                 with open(path, "r", encoding="utf-8") as f:
                     data = yaml.safe_load(f)
@@ -116,8 +152,11 @@ class RAGRetriever:
                     disease_id = os.path.basename(path).replace('.yaml', '')
                     data["id"] = f"kb:{crop}:{disease_id}"
                     data["_disease_id"] = disease_id  # For Rekognition matching
+                    self._precompute_scoring(data)
 
-                    cards.append(data)
+                    # Deeply read-only (nested actions, symptoms and
+                    # visual patterns too), so no stage can edit KB data
+                    cards.append(_freeze(data))
 
             except Exception as e:
                 logger.warning(f"Failed to load KB card {path}: {e}")
@@ -127,11 +166,30 @@ class RAGRetriever:
         return cards
 
 
+    @staticmethod
+    def _precompute_scoring(card: Dict) -> None:
+        """
+        Attach query-independent scoring inputs to a card.
+
+        Sets "_keywords" (KEYWORDS found in the card's symptoms) and the
+        "_powdery" / "_downy" visual pattern flags, so per-request scoring
+        is a set intersection plus two flag checks.
+        """
+        symptoms_lower = [s.lower() for s in card.get("symptoms") or []]
+        patterns_text = " ".join(card.get("visual_patterns") or []).lower()
+
+        card["_keywords"] = frozenset(
+            k for k in KEYWORDS if any(k in s for s in symptoms_lower)
+        )
+        card["_powdery"] = "powder" in patterns_text or "мучнист" in patterns_text
+        card["_downy"] = "downy" in patterns_text or "пероноспор" in patterns_text
+
+
     def _score_card(
         self,
-        symptoms_text: str,
+        text_keywords: frozenset,
         features: Dict[str, float],
-        card: Dict
+        card: Mapping
     ) -> float:
         """
         Score a disease card based on symptom matching and visual features.
@@ -143,41 +201,28 @@ class RAGRetriever:
         4. Sigmoid normalization: 1 - exp(-base)
 
         Args:
-            symptoms_text: User symptom description
+            text_keywords: KEYWORDS present in the user symptom description
             features: Visual features from CVService
-            card: Disease card dictionary
+            card: Disease card dictionary (see _precompute_scoring)
 
         Returns:
             Confidence score (0.0-1.0)
         """
-        text_lower = symptoms_text.lower()
-        base_score = 0.0
-
         # ─────────────────────────────────────────────────────
         # 1. KEYWORD MATCHING
         # ─────────────────────────────────────────────────────
-        card_symptoms = card.get("symptoms", [])
-
-        for keyword in KEYWORDS:
-            if keyword in text_lower:
-                # Check if this keyword appears in card's symptom descriptions
-                for symptom in card_symptoms:
-                    if keyword in symptom.lower():
-                        base_score += 1
-                        break  # Count each keyword only once
+        # +1 for each keyword found in both the query and card symptoms
+        base_score = float(len(text_keywords & card["_keywords"]))
 
         # ─────────────────────────────────────────────────────
         # 2. VISUAL PATTERN BONUS
         # ─────────────────────────────────────────────────────
-        visual_patterns = card.get("visual_patterns", [])
-        patterns_text = " ".join(visual_patterns).lower()
-
         # Powdery mildew (білий наліт)
-        if features.get("white_powder") and ("powder" in patterns_text or "мучнист" in patterns_text):
+        if features.get("white_powder") and card["_powdery"]:
             base_score += 2
 
         # Downy mildew (пероноспороз)
-        if features.get("downy_mildew") and ("downy" in patterns_text or "пероноспор" in patterns_text):
+        if features.get("downy_mildew") and card["_downy"]:
             base_score += 2
 
         # ─────────────────────────────────────────────────────
@@ -1 +1,8 @@
 # Storage services
+from app.services.storage.filesystem import cases_root, case_dir_for, find_case_dir
+
+__all__ = [
+    "cases_root",
+    "case_dir_for",
+    "find_case_dir",
+]
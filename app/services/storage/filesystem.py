@@ -0,0 +1,49 @@
+"""
+Filesystem layout for persisted diagnosis cases.
+
+Cases are stored as DATA_ROOT/cases/<YYYY-MM-DD>/<case_id>/.
+"""
+import os
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+
+def cases_root() -> Path:
+    """Root directory holding date-partitioned case directories."""
+    return Path(settings.DATA_ROOT) / "cases"
+
+
+def case_dir_for(case_id: str, date: str) -> Path:
+    """
+    Directory of a case saved on a given date.
+
+    Args:
+        case_id: UUID of the diagnosis case
+        date: ISO date (YYYY-MM-DD) the case was saved on
+    """
+    return cases_root() / date / case_id
+
+
+def find_case_dir(case_id: str) -> Optional[Path]:
+    """
+    Locate a case directory when its date is unknown.
+
+    Probes <date>/<case_id> once per date directory instead of walking
+    the whole tree.
+
+    Returns:
+        Case directory, or None if not found
+    """
+    try:
+        with os.scandir(cases_root()) as it:
+            date_dirs = [e.path for e in it if e.is_dir()]
+    except FileNotFoundError:
+        return None
+
+    for date_dir in date_dirs:
+        candidate = Path(date_dir) / case_id
+        if candidate.is_dir():
+            return candidate
+    return None
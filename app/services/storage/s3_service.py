@@ -7,6 +7,8 @@ import logging
 import uuid
 from datetime import datetime
 import mimetypes
+import re
+from contextlib import asynccontextmanager
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +23,29 @@ except ImportError:
 
 from app.core.config import settings
 
+# Anything except word characters, "." and "-" is dropped from S3 keys
+_UNSAFE_KEY_CHARS = re.compile(r"[^\w.-]")
+
 
 class S3Unavailable(Exception):
     """Raised when S3 service is unavailable or misconfigured."""
     pass
 
 
+# Shared clients (created lazily, reused across calls)
+_SYNC_CLIENT = None
+_ASYNC_SESSION = None
+_ASYNC_CLIENT = None
+_ASYNC_CLIENT_CM = None
+
+
 def _get_s3_client():
-    """Create synchronous S3 client."""
+    """Return shared synchronous S3 client, creating it on first use."""
+    global _SYNC_CLIENT
+
+    if _SYNC_CLIENT is not None:
+        return _SYNC_CLIENT
+
     if not AWS_AVAILABLE:
         raise S3Unavailable("AWS SDK not installed")
 
@@ -39,13 +56,17 @@ def _get_s3_client():
         raise S3Unavailable("S3_BUCKET not configured")
 
     try:
-        return boto3.client('s3', region_name=settings.S3_REGION)
+        _SYNC_CLIENT = boto3.client('s3', region_name=settings.S3_REGION)
     except (BotoCoreError, NoCredentialsError) as e:
         raise S3Unavailable(f"Failed to create S3 client: {e}")
 
+    return _SYNC_CLIENT
+
+
+def _get_s3_session():
+    """Return shared aioboto3 session, creating it on first use."""
+    global _ASYNC_SESSION
 
-async def _get_s3_client_async():
-    """Create async S3 client."""
     if not AWS_AVAILABLE:
         raise S3Unavailable("AWS SDK not installed")
 
@@ -55,8 +76,61 @@ async def _get_s3_client_async():
     if not settings.S3_BUCKET:
         raise S3Unavailable("S3_BUCKET not configured")
 
-    session = aioboto3.Session()
-    return session.client('s3', region_name=settings.S3_REGION)
+    if _ASYNC_SESSION is None:
+        _ASYNC_SESSION = aioboto3.Session()
+    return _ASYNC_SESSION
+
+
+async def _get_s3_client_async():
+    """Create async S3 client context from the shared session."""
+    return _get_s3_session().client('s3', region_name=settings.S3_REGION)
+
+
+async def open_s3_client_async():
+    """
+    Open the long-lived async S3 client.
+
+    Called once on application startup; async functions below reuse it
+    instead of entering a new client context per call.
+    """
+    global _ASYNC_CLIENT, _ASYNC_CLIENT_CM
+
+    if _ASYNC_CLIENT is not None:
+        return _ASYNC_CLIENT
+
+    _ASYNC_CLIENT_CM = await _get_s3_client_async()
+    _ASYNC_CLIENT = await _ASYNC_CLIENT_CM.__aenter__()
+    logger.info("Opened shared async S3 client")
+    return _ASYNC_CLIENT
+
+
+async def close_s3_client_async():
+    """Close the long-lived async S3 client (application shutdown)."""
+    global _ASYNC_CLIENT, _ASYNC_CLIENT_CM
+
+    if _ASYNC_CLIENT_CM is not None:
+        await _ASYNC_CLIENT_CM.__aexit__(None, None, None)
+        logger.info("Closed shared async S3 client")
+
+    _ASYNC_CLIENT = None
+    _ASYNC_CLIENT_CM = None
+
+
+@asynccontextmanager
+async def _s3_client_async(client=None):
+    """
+    Yield an async S3 client.
+
+    Uses the explicitly passed client, then the shared one opened on
+    startup, and only falls back to a short-lived client context.
+    """
+    client = client or _ASYNC_CLIENT
+    if client is not None:
+        yield client
+        return
+
+    async with await _get_s3_client_async() as fresh:
+        yield fresh
 
 
 def _generate_s3_key(case_id: str, filename: str) -> str:
@@ -66,7 +140,7 @@ def _generate_s3_key(case_id: str, filename: str) -> str:
     """
     date_str = datetime.utcnow().strftime("%Y-%m-%d")
     # Sanitize filename
-    safe_filename = "".join(c for c in filename if c.isalnum() or c in "._-")
+    safe_filename = _UNSAFE_KEY_CHARS.sub("", filename)
     return f"cases/{date_str}/{case_id}/{safe_filename}"
 
 
@@ -127,7 +201,8 @@ async def upload_image_async(
     case_id: str,
     filename: str,
     image_bytes: bytes,
-    content_type: Optional[str] = None
+    content_type: Optional[str] = None,
+    client=None
 ) -> Tuple[str, str]:
     """
     Asynchronously upload image to S3.
@@ -137,11 +212,12 @@ async def upload_image_async(
         filename: Original filename
         image_bytes: Image data
         content_type: MIME type (auto-detected if not provided)
+        client: Optional async S3 client (shared client used if omitted)
 
     Returns:
         Tuple of (s3_url, s3_key)
     """
-    async with await _get_s3_client_async() as client:
+    async with _s3_client_async(client) as client:
         s3_key = _generate_s3_key(case_id, filename)
 
         if not content_type:
@@ -172,7 +248,8 @@ async def upload_image_async(
 
 async def upload_images_batch_async(
     case_id: str,
-    images: List[Tuple[str, bytes, str]]
+    images: List[Tuple[str, bytes, str]],
+    client=None
 ) -> List[Tuple[str, str]]:
     """
     Upload multiple images concurrently.
@@ -180,18 +257,20 @@ async def upload_images_batch_async(
     Args:
         case_id: UUID of the diagnosis case
         images: List of (filename, image_bytes, content_type) tuples
+        client: Optional async S3 client (shared client used if omitted)
 
     Returns:
         List of (s3_url, s3_key) tuples
     """
     import asyncio
 
-    tasks = [
-        upload_image_async(case_id, filename, image_bytes, content_type)
-        for filename, image_bytes, content_type in images
-    ]
+    async with _s3_client_async(client) as client:
+        tasks = [
+            upload_image_async(case_id, filename, image_bytes, content_type, client=client)
+            for filename, image_bytes, content_type in images
+        ]
 
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
 
     # Filter out exceptions
     successful = [r for r in results if not isinstance(r, Exception)]
@@ -229,11 +308,11 @@ def get_signed_url_sync(s3_key: str, expires_in: int = 3600) -> str:
         raise
 
 
-async def get_signed_url_async(s3_key: str, expires_in: int = 3600) -> str:
+async def get_signed_url_async(s3_key: str, expires_in: int = 3600, client=None) -> str:
     """
     Async version of presigned URL generation.
     """
-    async with await _get_s3_client_async() as client:
+    async with _s3_client_async(client) as client:
         try:
             url = await client.generate_presigned_url(
                 'get_object',
@@ -275,11 +354,11 @@ def delete_image_sync(s3_key: str) -> bool:
         return False
 
 
-async def delete_image_async(s3_key: str) -> bool:
+async def delete_image_async(s3_key: str, client=None) -> bool:
     """
     Async version of image deletion.
     """
-    async with await _get_s3_client_async() as client:
+    async with _s3_client_async(client) as client:
         try:
             await client.delete_object(
                 Bucket=settings.S3_BUCKET,
@@ -2,14 +2,17 @@
 Pytest fixtures for AgroDiag tests.
 """
 import os
+import functools
 import tempfile
-import shutil
 from pathlib import Path
+from types import MappingProxyType
 import pytest
 from fastapi.testclient import TestClient
 
 # Set test environment variables BEFORE importing app
-os.environ['AGRO_DATA_ROOT'] = tempfile.mkdtemp()
+# Each xdist worker is its own process, so give it its own data root
+_WORKER_ID = os.environ.get('PYTEST_XDIST_WORKER', 'main')
+os.environ['AGRO_DATA_ROOT'] = tempfile.mkdtemp(prefix=f'agro_{_WORKER_ID}_')
 os.environ['AGRO_MAX_IMAGES'] = '3'
 os.environ['AGRO_MAX_IMAGE_MB'] = '2'
 os.environ['AGRO_USE_REKOGNITION'] = 'false'
@@ -19,55 +22,126 @@ from app.main import app
 from app.core.config import settings
 
 
-@pytest.fixture(scope="function")
-def client():
-    """FastAPI test client."""
-    return TestClient(app)
+@pytest.fixture(scope="session")
+def app_instance():
+    """FastAPI application, imported once per test session."""
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app_instance):
+    """
+    FastAPI test client, shared across the test session.
+
+    Used as a context manager so startup/shutdown (lifespan) run once.
+    """
+    with TestClient(app_instance) as c:
+        yield c
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warmup_pipeline(client, sample_diagnose_request):
+    """
+    Run one throwaway diagnosis before any test.
+
+    The first request pays for KB loading and schema warm-up; doing it here
+    keeps that cost out of whichever test happens to run first (--durations).
+    The case lands in the session DATA_ROOT, not in any temp_data_root.
+    """
+    client.post("/v1/diagnose", data=sample_diagnose_request)
+    yield
+
+
+@pytest.fixture
+async def async_client(app_instance):
+    """Async HTTP client bound to the app, for issuing concurrent requests."""
+    import httpx
+
+    transport = httpx.ASGITransport(app=app_instance)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as c:
+        yield c
+
+
+class _StubOrchestrator:
+    """Orchestrator stand-in returning a fixed, pre-validated response."""
+
+    async def run_pipeline(self, req, images, case_id, **kwargs):
+        from app.api.schemas import DiagnoseResponse, Candidate, ActionPlan
+
+        return DiagnoseResponse.model_construct(
+            case_id=case_id,
+            candidates=[
+                Candidate.model_construct(disease="stub", score=0.5, rationale="stub", kb_refs=[])
+            ],
+            plan=ActionPlan.model_construct(diagnostics=[], agronomy=[], chemical=[], bio=[]),
+            disclaimers=[],
+            visual_features=None,
+            debug=None,
+        )
+
+
+@pytest.fixture
+def stub_orchestrator(app_instance):
+    """
+    Replace the diagnosis pipeline with a stub for HTTP wiring tests.
+
+    Integration tests keep the real pipeline.
+    """
+    from app.api.routes.diagnose import get_orchestrator
+
+    app_instance.dependency_overrides[get_orchestrator] = _StubOrchestrator
+    yield
+    app_instance.dependency_overrides.pop(get_orchestrator, None)
 
 
 @pytest.fixture(scope="function")
-def temp_data_root(monkeypatch):
+def temp_data_root(tmp_path, monkeypatch):
     """
     Create temporary data directory for testing.
     Automatically cleaned up after test.
+
+    The shared ``settings`` object is patched directly: modules import it
+    at load time, so clearing ``get_settings``' cache would not reach them.
     """
-    temp_dir = tempfile.mkdtemp()
+    temp_dir = str(tmp_path / "data")
+    os.makedirs(temp_dir)
     monkeypatch.setenv("AGRO_DATA_ROOT", temp_dir)
-
-    # Reload settings to pick up new env var
-    from app.core import config
-    config.get_settings.cache_clear()
+    monkeypatch.setattr(settings, "DATA_ROOT", temp_dir)
 
     yield temp_dir
 
-    # Cleanup
-    shutil.rmtree(temp_dir, ignore_errors=True)
 
+# 1x1 RGB red pixel: signature, IHDR, IDAT, IEND
+_TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a"
+    "0000000d4948445200000001000000010802000000907753de"
+    "0000000c4944415478da63f8cfc0000003010100f7034143"
+    "0000000049454e44ae426082"
+)
 
-@pytest.fixture
+SAMPLE_DIAGNOSE_REQUEST = MappingProxyType({
+    "crop": "tomato",
+    "symptoms_text": "brown water-soaked spots on leaves with white coating underneath",
+    "growth_stage": "vegetative",
+    "lat": 50.4501,
+    "lon": 30.5234
+})
+
+
+@pytest.fixture(scope="session")
 def sample_diagnose_request():
-    """Sample diagnosis request payload."""
-    return {
-        "crop": "tomato",
-        "symptoms_text": "brown water-soaked spots on leaves with white coating underneath",
-        "growth_stage": "vegetative",
-        "lat": 50.4501,
-        "lon": 30.5234
-    }
+    """
+    Sample diagnosis request payload (read-only).
 
+    Build variants with a spread: ``{**sample_diagnose_request, "crop": "x"}``.
+    """
+    return SAMPLE_DIAGNOSE_REQUEST
 
-@pytest.fixture
-def sample_image_bytes():
-    """Generate a minimal valid PNG image for testing."""
-    from io import BytesIO
-    from PIL import Image
 
-    # Create 100x100 red square
-    img = Image.new('RGB', (100, 100), color='red')
-    buf = BytesIO()
-    img.save(buf, format='PNG')
-    buf.seek(0)
-    return buf.read()
+@pytest.fixture(scope="session")
+def sample_image_bytes():
+    """Minimal valid PNG image for testing (1x1 red pixel, no PIL needed)."""
+    return _TINY_PNG
 
 
 @pytest.fixture
@@ -76,15 +150,39 @@ def invalid_image_bytes():
     return b"not a valid image"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def oversized_image_bytes():
-    """Generate image larger than MAX_IMAGE_MB for testing."""
-    from io import BytesIO
-    from PIL import Image
-
-    # Create large image (should exceed 2MB test limit)
-    img = Image.new('RGB', (3000, 3000), color='blue')
-    buf = BytesIO()
-    img.save(buf, format='PNG', compress_level=0)
-    buf.seek(0)
-    return buf.read()
+    """
+    Generate payload larger than MAX_IMAGE_MB for testing.
+
+    The size check runs before decoding, so a PNG signature followed by
+    padding is enough.
+    """
+    return b"\x89PNG\r\n\x1a\n" + bytes(settings.MAX_IMAGE_MB * 1024 * 1024)
+
+
+@pytest.fixture(scope="session")
+def multipart_with_n_images(sample_image_bytes):
+    """
+    Pre-encoded multipart body for the sample request with n PNG images.
+
+    Returns a function n -> (body_bytes, content_type), cached per n so each
+    payload shape is encoded once per session. Post it with
+    ``client.post(url, content=body, headers={"content-type": content_type})``.
+    """
+    import httpx
+
+    @functools.lru_cache(maxsize=None)
+    def build(n):
+        request = httpx.Request(
+            "POST",
+            "http://testserver/v1/diagnose",
+            data=SAMPLE_DIAGNOSE_REQUEST,
+            files=[
+                ("images", (f"test{i}.png", sample_image_bytes, "image/png"))
+                for i in range(1, n + 1)
+            ],
+        )
+        return request.read(), request.headers["content-type"]
+
+    return build
@@ -106,6 +106,23 @@ def test_list_cases_invalid_date_format(client):
     assert "Invalid date format" in response.json()["detail"]
 
 
+def test_list_cases_with_search_and_crop_filters(client, created_case):
+    """Test GET /v1/cases?search=...&crop=... filters on the server."""
+    case_id, _ = created_case
+
+    response = client.get("/v1/cases", params={"search": "WATER-SOAKED", "crop": "tomato"})
+    assert response.status_code == 200
+    assert case_id in [c["case_id"] for c in response.json()["cases"]]
+
+    response = client.get("/v1/cases", params={"search": "no such symptom"})
+    assert response.status_code == 200
+    assert response.json()["cases"] == []
+
+    response = client.get("/v1/cases", params={"crop": "wheat"})
+    assert response.status_code == 200
+    assert case_id not in [c["case_id"] for c in response.json()["cases"]]
+
+
 def test_list_cases_with_limit(client, created_case):
     """Test GET /v1/cases respects limit parameter."""
     response = client.get("/v1/cases?limit=1")
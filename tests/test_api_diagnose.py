@@ -4,6 +4,8 @@ Tests for POST /v1/diagnose endpoint.
 import pytest
 from io import BytesIO
 
+from app.api.schemas import DiagnoseResponse
+
 
 def test_health_endpoint(client):
     """Sanity check: health endpoint works."""
@@ -12,6 +14,15 @@ def test_health_endpoint(client):
     assert response.json() == {"status": "ok"}
 
 
+def test_meta_crops_lists_supported_crops(client):
+    """GET /v1/meta/crops returns every supported crop."""
+    from app.api.schemas import SUPPORTED_CROPS
+
+    response = client.get("/v1/meta/crops")
+    assert response.status_code == 200
+    assert response.json() == sorted(SUPPORTED_CROPS)
+
+
 def test_diagnose_without_images_success(client, sample_diagnose_request, temp_data_root):
     """Test POST /v1/diagnose without images (text-only diagnosis)."""
     response = client.post(
@@ -20,30 +31,23 @@ def test_diagnose_without_images_success(client, sample_diagnose_request, temp_d
     )
 
     assert response.status_code == 200
-    data = response.json()
+    # Decode once against the response schema (also catches shape regressions)
+    resp = DiagnoseResponse.model_validate_json(response.content)
 
-    # Validate response structure
-    assert "case_id" in data
-    assert "candidates" in data
-    assert "plan" in data
-    assert "disclaimers" in data
+    # Validate response structure (fields must be sent, not defaulted)
+    assert {"case_id", "candidates", "plan", "disclaimers"} <= resp.model_fields_set
 
     # Should have at least one candidate
-    assert len(data["candidates"]) > 0
+    assert len(resp.candidates) > 0
 
     # Validate candidate structure
-    candidate = data["candidates"][0]
-    assert "disease" in candidate
-    assert "score" in candidate
-    assert "rationale" in candidate
-    assert 0 <= candidate["score"] <= 1
+    candidate = resp.candidates[0]
+    assert candidate.disease
+    assert candidate.rationale
+    assert 0 <= candidate.score <= 1
 
     # Validate plan structure
-    plan = data["plan"]
-    assert "diagnostics" in plan
-    assert "agronomy" in plan
-    assert "chemical" in plan
-    assert "bio" in plan
+    assert {"diagnostics", "agronomy", "chemical", "bio"} <= resp.plan.model_fields_set
 
 
 def test_diagnose_with_one_image_success(client, sample_diagnose_request, sample_image_bytes):
@@ -55,111 +59,90 @@ def test_diagnose_with_one_image_success(client, sample_diagnose_request, sample
     )
 
     assert response.status_code == 200
-    data = response.json()
+    resp = DiagnoseResponse.model_validate_json(response.content)
 
-    assert "case_id" in data
-    assert len(data["candidates"]) > 0
+    assert resp.case_id
+    assert len(resp.candidates) > 0
 
     # Debug info should show CV processing occurred
-    if "debug" in data:
-        assert "timings" in data["debug"]
-        assert "cv" in data["debug"]["timings"]
+    if resp.debug is not None:
+        assert "cv" in resp.debug.timings
 
 
-def test_diagnose_with_multiple_images(client, sample_diagnose_request, sample_image_bytes):
-    """Test POST /v1/diagnose with multiple images (within limit)."""
+@pytest.mark.unit
+def test_diagnose_with_multiple_images(client, stub_orchestrator, multipart_with_n_images):
+    """Test POST /v1/diagnose accepts multiple images (within limit)."""
     # AGRO_MAX_IMAGES is set to 3 in conftest
-    files = [
-        ("images", ("test1.png", BytesIO(sample_image_bytes), "image/png")),
-        ("images", ("test2.png", BytesIO(sample_image_bytes), "image/png")),
-    ]
+    body, content_type = multipart_with_n_images(2)
 
     response = client.post(
         "/v1/diagnose",
-        data=sample_diagnose_request,
-        files=files
+        content=body,
+        headers={"content-type": content_type}
     )
 
     assert response.status_code == 200
 
 
-def test_diagnose_invalid_mime_type(client, sample_diagnose_request):
-    """Test rejection of invalid MIME type."""
-    response = client.post(
-        "/v1/diagnose",
-        data=sample_diagnose_request,
-        files={"images": ("test.txt", BytesIO(b"text file"), "text/plain")}
+@pytest.mark.parametrize(
+    "payload, make_files, status_code, message",
+    [
+        pytest.param(
+            None,
+            lambda png, huge, multipart: {"images": ("test.txt", BytesIO(b"text file"), "text/plain")},
+            400, "Unsupported file type",
+            id="invalid_mime_type",
+        ),
+        pytest.param(
+            # MAX_IMAGES is 3 in test config, send 4
+            None,
+            lambda png, huge, multipart: multipart(4),
+            400, "Too many files",
+            id="too_many_images",
+        ),
+        pytest.param(
+            None,
+            lambda png, huge, multipart: {"images": ("huge.png", BytesIO(huge), "image/png")},
+            400, "exceeds",
+            id="oversized_image",
+        ),
+        pytest.param(
+            {"crop": "tomato"},  # Missing symptoms_text
+            None,
+            422, "symptoms_text",
+            id="missing_required_field",
+        ),
+        pytest.param(
+            {"crop": "banana", "symptoms_text": "yellow spots on leaves"},  # Not in SUPPORTED_CROPS
+            None,
+            400, "Unsupported crop",
+            id="invalid_crop",
+        ),
+        pytest.param(
+            {"crop": "tomato", "symptoms_text": "abc"},  # Less than 5 characters
+            None,
+            422, "symptoms_text",
+            id="symptoms_too_short",
+        ),
+    ],
+)
+def test_diagnose_rejects_invalid_input(
+    client, sample_diagnose_request, sample_image_bytes, oversized_image_bytes,
+    multipart_with_n_images, payload, make_files, status_code, message
+):
+    """Test rejection of invalid uploads and form fields."""
+    data = sample_diagnose_request if payload is None else payload
+    files = (
+        make_files(sample_image_bytes, oversized_image_bytes, multipart_with_n_images)
+        if make_files else None
     )
 
-    assert response.status_code == 400
-    assert "Unsupported file type" in response.json()["detail"]
-
-
-def test_diagnose_too_many_images(client, sample_diagnose_request, sample_image_bytes):
-    """Test rejection when exceeding MAX_IMAGES limit."""
-    # MAX_IMAGES is 3 in test config, send 4
-    files = [
-        ("images", (f"test{i}.png", BytesIO(sample_image_bytes), "image/png"))
-        for i in range(4)
-    ]
-
-    response = client.post(
-        "/v1/diagnose",
-        data=sample_diagnose_request,
-        files=files
-    )
-
-    assert response.status_code == 400
-    assert "Too many files" in response.json()["detail"]
-
-
-def test_diagnose_oversized_image(client, sample_diagnose_request, oversized_image_bytes):
-    """Test rejection of image exceeding MAX_IMAGE_MB."""
-    response = client.post(
-        "/v1/diagnose",
-        data=sample_diagnose_request,
-        files={"images": ("huge.png", BytesIO(oversized_image_bytes), "image/png")}
-    )
-
-    assert response.status_code == 400
-    assert "exceeds" in response.json()["detail"].lower()
-
-
-def test_diagnose_missing_required_field(client):
-    """Test validation error when required field missing."""
-    response = client.post(
-        "/v1/diagnose",
-        data={
-            "crop": "tomato",
-            # Missing symptoms_text
-        }
-    )
-
-    assert response.status_code == 422  # Validation error
-
-
-def test_diagnose_invalid_crop(client):
-    """Test validation error for unsupported crop."""
-    response = client.post(
-        "/v1/diagnose",
-        data={
-            "crop": "banana",  # Not in SUPPORTED_CROPS
-            "symptoms_text": "yellow spots on leaves"
-        }
-    )
-
-    assert response.status_code == 400
-    assert "Unsupported crop" in response.json()["detail"]
-
-
-def test_diagnose_symptoms_too_short(client):
-    """Test validation error for symptoms text too short."""
-    response = client.post(
-        "/v1/diagnose",
-        data={
-            "crop": "tomato",
-            "symptoms_text": "abc"  # Less than 5 characters
-        }
-    )
+    if isinstance(files, tuple):
+        # Pre-encoded multipart body (already carries the sample form fields)
+        body, content_type = files
+        response = client.post("/v1/diagnose", content=body, headers={"content-type": content_type})
+    else:
+        response = client.post("/v1/diagnose", data=data, files=files)
 
-    assert response.status_code == 422
+    assert response.status_code == status_code
+    assert message in response.json()["detail"]
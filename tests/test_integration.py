@@ -1,11 +1,15 @@
 """
 End-to-end integration tests.
 """
+import asyncio
+import os
 import pytest
 from pathlib import Path
 import json
 from io import BytesIO
 
+from app.services.storage import find_case_dir
+
 
 @pytest.mark.integration
 def test_full_diagnosis_workflow(client, sample_diagnose_request, sample_image_bytes, temp_data_root):
@@ -19,45 +23,37 @@ def test_full_diagnosis_workflow(client, sample_diagnose_request, sample_image_b
 
     assert response.status_code == 200
     case_id = response.json()["case_id"]
-    original_response = response.json()
-
-    # Step 2: Verify case was persisted to disk
-    data_root = Path(temp_data_root)
-    cases_dir = data_root / "cases"
-    assert cases_dir.exists()
 
-    # Find case directory
-    case_dirs = list(cases_dir.rglob(case_id))
-    assert len(case_dirs) > 0
-    case_dir = case_dirs[0]
+    # Step 2: Verify case was persisted to disk (under the test's DATA_ROOT)
+    case_dir = find_case_dir(case_id)
+    assert case_dir is not None
+    assert case_dir.parent.parent == Path(temp_data_root) / "cases"
 
-    # Verify files exist
-    assert (case_dir / "request.json").exists()
-    assert (case_dir / "response.json").exists()
-    assert (case_dir / "trace.json").exists()
-    assert (case_dir / "images").exists()
+    # Verify files exist (one directory listing instead of a stat per file)
+    entries = {entry.name for entry in os.scandir(case_dir)}
+    assert {"request.json", "response.json.gz", "trace.json.gz", "images"} <= entries
 
     # Step 3: Retrieve via API
     get_response = client.get(f"/v1/cases/{case_id}")
     assert get_response.status_code == 200
 
-    # Step 4: Verify retrieved data matches original
-    retrieved = get_response.json()
-    assert retrieved["case_id"] == original_response["case_id"]
-    assert len(retrieved["candidates"]) == len(original_response["candidates"])
+    # Step 4: Verify retrieved data matches original byte-for-byte
+    # (both bodies are serialized from the same response model)
+    assert get_response.content == response.content
 
     # Step 5: Verify image was saved
-    image_files = list((case_dir / "images").glob("*.png"))
+    image_files = [e for e in os.scandir(case_dir / "images") if e.name.endswith(".png")]
     assert len(image_files) == 1
 
 
 @pytest.mark.integration
-def test_pipeline_with_multiple_crops(client, sample_image_bytes):
-    """Test pipeline works for all supported crops."""
+async def test_pipeline_with_multiple_crops(async_client, sample_image_bytes):
+    """Test pipeline works for all supported crops (requests issued concurrently)."""
     from app.api.schemas import SUPPORTED_CROPS
 
-    for crop in SUPPORTED_CROPS:
-        response = client.post(
+    crops = sorted(SUPPORTED_CROPS)
+    responses = await asyncio.gather(*[
+        async_client.post(
             "/v1/diagnose",
             data={
                 "crop": crop,
@@ -66,7 +62,10 @@ def test_pipeline_with_multiple_crops(client, sample_image_bytes):
             },
             files={"images": ("test.png", BytesIO(sample_image_bytes), "image/png")}
         )
+        for crop in crops
+    ])
 
+    for crop, response in zip(crops, responses):
         assert response.status_code == 200, f"Failed for crop: {crop}"
         data = response.json()
         assert len(data["candidates"]) > 0
@@ -78,10 +77,10 @@ def test_error_handling_preserves_data_integrity(client, sample_diagnose_request
     # This test would check that failed requests don't create partial case directories
     # For now, just verify clean failure
 
-    invalid_request = sample_diagnose_request.copy()
-    invalid_request["crop"] = "invalid_crop"
-
-    response = client.post("/v1/diagnose", data=invalid_request)
+    response = client.post(
+        "/v1/diagnose",
+        data={**sample_diagnose_request, "crop": "invalid_crop"}
+    )
     assert response.status_code == 400
 
     # Verify no partial case directories created
@@ -113,3 +112,122 @@ def test_case_listing_pagination(client, sample_diagnose_request):
     returned_ids = [c["case_id"] for c in data["cases"]]
     for case_id in case_ids:
         assert case_id in returned_ids
+
+
+@pytest.mark.integration
+def test_s3_upload_skips_local_images(client, sample_diagnose_request, sample_image_bytes, temp_data_root, monkeypatch):
+    """With S3 enabled, uploaded images get an s3_key and no local copy."""
+    from app.core.config import settings
+    from app.services.storage import s3_service
+
+    async def fake_upload(case_id, filename, image_bytes, content_type=None, client=None):
+        key = f"cases/{case_id}/{filename}"
+        return f"https://bucket.example/{key}", key
+
+    monkeypatch.setattr(settings, "USE_S3", True)
+    monkeypatch.setattr(s3_service, "upload_image_async", fake_upload)
+
+    response = client.post(
+        "/v1/diagnose",
+        data=sample_diagnose_request,
+        files={"images": ("test.png", BytesIO(sample_image_bytes), "image/png")}
+    )
+    assert response.status_code == 200
+    case_id = response.json()["case_id"]
+
+    case_dir = find_case_dir(case_id)
+    assert not (case_dir / "images").exists()
+    with open(case_dir / "request.json", encoding="utf-8") as f:
+        images_meta = json.load(f)["_images"]
+    assert images_meta[0]["s3_key"] == f"cases/{case_id}/test.png"
+
+
+@pytest.mark.integration
+def test_s3_upload_failure_falls_back_to_local(client, sample_diagnose_request, sample_image_bytes, temp_data_root, monkeypatch):
+    """Images whose S3 upload fails are written to the local images/ dir."""
+    from app.core.config import settings
+    from app.services.storage import s3_service
+
+    async def failing_upload(*args, **kwargs):
+        raise s3_service.S3Unavailable("bucket unreachable")
+
+    monkeypatch.setattr(settings, "USE_S3", True)
+    monkeypatch.setattr(s3_service, "upload_image_async", failing_upload)
+
+    response = client.post(
+        "/v1/diagnose",
+        data=sample_diagnose_request,
+        files={"images": ("test.png", BytesIO(sample_image_bytes), "image/png")}
+    )
+    assert response.status_code == 200
+
+    case_dir = find_case_dir(response.json()["case_id"])
+    assert [e.name for e in os.scandir(case_dir / "images")] == ["test.png"]
+    with open(case_dir / "request.json", encoding="utf-8") as f:
+        assert "s3_key" not in json.load(f)["_images"][0]
+
+
+@pytest.mark.integration
+def test_s3_upload_cancelled_when_pipeline_fails(client, sample_diagnose_request, sample_image_bytes, temp_data_root, monkeypatch):
+    """A pipeline error cancels the in-flight S3 upload instead of orphaning it."""
+    from fastapi import HTTPException
+    from app.core.config import settings
+    from app.services.storage import s3_service
+
+    upload_cancelled = []
+
+    async def slow_upload(*args, **kwargs):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            upload_cancelled.append(True)
+            raise
+
+    async def failing_rank(*args, **kwargs):
+        raise HTTPException(status_code=503, detail="LLM unavailable")
+
+    monkeypatch.setattr(settings, "USE_S3", True)
+    monkeypatch.setattr(s3_service, "upload_image_async", slow_upload)
+    monkeypatch.setattr(client.app.state.orchestrator.llm_client, "rank_and_reason", failing_rank)
+
+    response = client.post(
+        "/v1/diagnose",
+        data=sample_diagnose_request,
+        files={"images": ("test.png", BytesIO(sample_image_bytes), "image/png")}
+    )
+    assert response.status_code == 503
+    assert upload_cancelled == [True]
+    assert not (Path(temp_data_root) / "cases").exists()
+
+
+@pytest.mark.integration
+def test_kb_load_cancelled_when_cv_fails(client, sample_diagnose_request, temp_data_root, monkeypatch):
+    """A CV error cancels the overlapped KB load instead of leaving it pending."""
+    import time
+    from fastapi import HTTPException
+
+    orchestrator = client.app.state.orchestrator
+    timed = orchestrator._timed
+    cancelled = []
+
+    async def tracking_timed(awaitable):
+        try:
+            return await timed(awaitable)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def failing_cv(*args, **kwargs):
+        raise HTTPException(status_code=503, detail="CV unavailable")
+
+    def slow_load_cards(crop):
+        time.sleep(0.2)
+        return []
+
+    monkeypatch.setattr(orchestrator, "_timed", tracking_timed)
+    monkeypatch.setattr(orchestrator.cv_service, "extract_features", failing_cv)
+    monkeypatch.setattr(orchestrator.rag_retriever, "load_cards", slow_load_cards)
+
+    response = client.post("/v1/diagnose", data=sample_diagnose_request)
+    assert response.status_code == 503
+    assert cancelled == [True]
@@ -0,0 +1,35 @@
+"""
+Tests for the UI's client-side upload compression.
+
+The UI is a separate Streamlit app; these run only where its requirements
+(ui/requirements.txt) are installed.
+"""
+import sys
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("streamlit")
+Image = pytest.importorskip("PIL.Image")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "ui"))
+from _diag import UPLOAD_MAX_SIDE, shrink_image  # noqa: E402
+
+_EXIF_MODEL = 0x0110
+_EXIF_ORIENTATION = 0x0112
+
+
+def test_shrink_image_keeps_exif_and_applies_orientation():
+    """Compressed JPEGs keep their EXIF and arrive upright."""
+    exif = Image.Exif()
+    exif[_EXIF_MODEL] = "TestCam"
+    exif[_EXIF_ORIENTATION] = 6  # rotate 90° CW to display
+    src = BytesIO()
+    Image.new("RGB", (3000, 1000), "red").save(src, "JPEG", exif=exif.tobytes())
+
+    with Image.open(BytesIO(shrink_image(src.getvalue()))) as out:
+        assert out.size == (UPLOAD_MAX_SIDE // 3, UPLOAD_MAX_SIDE)
+        out_exif = out.getexif()
+        assert out_exif[_EXIF_MODEL] == "TestCam"
+        assert out_exif.get(_EXIF_ORIENTATION, 1) == 1
@@ -0,0 +1,354 @@
+"""
+Shared helpers for the AgroDiag diagnosis page.
+
+Kept out of the page script so reruns only execute page layout code; the
+functions here are defined once per process and imported by app.py.
+"""
+import functools
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from pathlib import Path
+
+import streamlit as st
+
+# PIL is imported inside the image helpers, so it only loads once a photo is
+# uploaded. httpx / orjson are imported locally too, but get_crops() needs
+# them on the first paint anyway.
+
+
+DEFAULT_BACKEND_URL = "http://127.0.0.1:8000"
+
+
+@st.cache_resource
+def resolve_backend_url() -> str:
+    """Default backend base URL: st.secrets, then $BACKEND_URL, then localhost."""
+    try:
+        return st.secrets["BACKEND_URL"]
+    except (FileNotFoundError, KeyError):
+        return os.getenv("BACKEND_URL", DEFAULT_BACKEND_URL)
+
+
+@st.cache_resource
+def get_http_client():
+    """Shared HTTP client: keeps the backend connection alive across submits."""
+    import httpx
+
+    # Small keep-alive pool; connect failures are retried by the transport.
+    # POSTs are not retried on 5xx: a repeated submit would create a new case.
+    transport = httpx.HTTPTransport(
+        retries=2,
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=4),
+    )
+    return httpx.Client(timeout=60, transport=transport)
+
+
+# Fallback when the backend is unreachable; the first entry is the form default
+DEFAULT_CROPS = ["tomato", "potato", "pepper", "cucumber", "onion", "garlic", "cabbage", "carrot", "beet", "wheat"]
+GROWTH_STAGES = ["", "seedling", "vegetative", "flowering", "fruiting", "tubering", "tuber_development"]
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_crops(base_url: str) -> list:
+    """Supported crops from the backend, cached per URL for an hour."""
+    import httpx
+    import orjson
+
+    try:
+        res = get_http_client().get(f"{base_url}/v1/meta/crops", timeout=5)
+        res.raise_for_status()
+        crops = orjson.loads(res.content)
+    except (httpx.HTTPError, orjson.JSONDecodeError):
+        return DEFAULT_CROPS
+    # Keep the familiar ordering for known crops, append any new ones
+    known = [c for c in DEFAULT_CROPS if c in crops]
+    return known + [c for c in crops if c not in known]
+
+
+DIAG_TIMEOUT_S = 120
+DIAG_POLL_S = 0.5
+DIAG_CACHE_SIZE = 16  # results kept per browser session
+
+
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """Worker threads for diagnose requests, shared across sessions."""
+    return ThreadPoolExecutor(max_workers=4)
+
+
+def build_form_data(crop: str, symptoms_text: str, growth_stage: str, lat: str, lon: str) -> tuple:
+    """Multipart form fields for /v1/diagnose plus any warnings to show."""
+    data = {
+        "crop": crop,
+        "symptoms_text": symptoms_text,
+        "growth_stage": growth_stage or "",
+    }
+
+    # Add location if provided
+    notices = []
+    if lat and lon:
+        try:
+            data["lat"] = float(lat)
+            data["lon"] = float(lon)
+        except ValueError:
+            data.pop("lat", None)
+            notices.append("⚠️ Некоректні координати. Діагностика буде проведена без врахування локації.")
+    return data, notices
+
+
+THUMB_SIZE = (512, 512)
+PREVIEW_WIDTH = 200
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def make_thumb(digest: str, _data: bytes) -> bytes:
+    """
+    Downscaled PNG preview of an upload.
+
+    Keyed on the content digest only (the underscore keeps streamlit from
+    hashing the raw bytes again), so reruns reuse the thumbnail.
+    """
+    import io
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(_data)) as im:
+            im.thumbnail(THUMB_SIZE)
+            out = io.BytesIO()
+            im.save(out, format="PNG")
+            return out.getvalue()
+    except (OSError, ValueError):  # PIL.UnidentifiedImageError is an OSError
+        return _data
+
+
+# Client-side upload limits (the backend enforces its own MAX_IMAGES / MAX_IMAGE_MB)
+MAX_UPLOAD_FILES = 4
+MAX_UPLOAD_MB = 8
+
+# Client-side compression: diagnosis does not need full sensor resolution
+UPLOAD_MAX_SIDE = 1600
+UPLOAD_JPEG_QUALITY = 85
+COMPRESS_MIN_BYTES = 300 * 1024
+
+
+def shrink_image(data: bytes) -> bytes:
+    """
+    Re-encode an image as JPEG with the long side capped at UPLOAD_MAX_SIDE.
+
+    EXIF is carried over (the backend records it per case); the pixels are
+    rotated upright first, so the Orientation tag no longer applies.
+    """
+    import io
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as src:
+        im = ImageOps.exif_transpose(src)  # also resets Orientation in the EXIF
+        im.thumbnail((UPLOAD_MAX_SIDE, UPLOAD_MAX_SIDE))
+        out = io.BytesIO()
+        im.convert("RGB").save(
+            out,
+            "JPEG",
+            quality=UPLOAD_JPEG_QUALITY,
+            optimize=True,
+            exif=im.info.get("exif", b""),
+        )
+        return out.getvalue()
+
+
+def upload_part(img, compress: bool) -> tuple:
+    """Multipart (filename, content, mime) for an uploaded file."""
+    if compress and img.size > COMPRESS_MIN_BYTES:
+        try:
+            jpg_name = img.name.rsplit(".", 1)[0] + ".jpg"
+            return (jpg_name, shrink_image(img.getvalue()), "image/jpeg")
+        except (OSError, ValueError):
+            pass  # not decodable here: send as-is and let the backend report it
+    img.seek(0)  # preview may have consumed the buffer
+    return (img.name, img, img.type or "application/octet-stream")
+
+
+STATIC_DIR = Path(__file__).parent / "static"
+
+
+@st.cache_data(show_spinner=False)
+def load_css(name: str) -> str:
+    """<style> block for a stylesheet in ui/static, read once per process (all pages)."""
+    return f"<style>\n{(STATIC_DIR / name).read_text(encoding='utf-8')}</style>"
+
+
+# Visual features that are image statistics or basic CV flags, not diseases
+_BASIC_FEATURE_RE = re.compile(r"img|white_like|very_dark|edges_mean")
+_BASIC_FEATURES = frozenset({
+    'lesion_spots', 'white_powder', 'downy_mildew', 'wilting',
+    'yellowing', 'black_spots', 'water_soaked',
+})
+
+
+_by_value = itemgetter(1)  # sort key for dict.items() by value
+
+
+@functools.lru_cache(maxsize=256)
+def _label(key: str) -> str:
+    """Human-readable label for a feature key: 'black_spots' -> 'Black Spots'."""
+    return key.replace('_', ' ').title()
+
+
+def _json_text(obj) -> str:
+    """Indented JSON text for st.code (cheaper than the st.json widget)."""
+    import orjson
+
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+
+def _mdlist(items) -> str:
+    """Numbered markdown list (one element per plan section)."""
+    return "\n".join(f"{i}. {t}" for i, t in enumerate(items, 1)) or "_Немає рекомендацій_"
+
+
+@st.fragment
+def render_result(body: dict) -> None:
+    """
+    Render a successful /v1/diagnose response.
+
+    A fragment: interacting with widgets inside it (e.g. the debug expander)
+    reruns only this function, not the whole page.
+    """
+    # Success message
+    st.success("✅ Діагностика завершена успішно!")
+
+    # Case ID
+    st.code(f"🆔 Case ID: {body.get('case_id')}", language="text")
+
+    # Display visual features (Recognition results) if available
+    visual_feats = body.get("visual_features", {})
+    if visual_feats:
+        st.subheader("🔬 Результати аналізу зображень")
+
+        # Separate Rekognition disease detections from other features
+        rekognition_diseases = {}
+        rekognition_features = {}
+        other_features = {}
+
+        for key, value in visual_feats.items():
+            if key[:1] == '_':
+                continue  # Skip internal/debug features
+            if key.endswith('_rek'):
+                # Rekognition standard label features
+                rekognition_features[key[:-4]] = value
+            elif _BASIC_FEATURE_RE.search(key) or key in _BASIC_FEATURES:
+                other_features[key] = value
+            else:
+                # Likely a disease name from Custom Labels
+                rekognition_diseases[key] = value
+
+        # Display Rekognition Custom Labels (disease detections) prominently
+        if rekognition_diseases:
+            st.markdown("### 🎯 AWS Rekognition - Виявлені захворювання")
+            with st.container(border=True):
+                st.write("**Результати Custom Labels моделі:**")
+
+                # Sort by confidence (highest first)
+                sorted_diseases = sorted(rekognition_diseases.items(), key=_by_value, reverse=True)
+
+                cols_rek = st.columns(min(len(sorted_diseases), 3))
+                for idx, (disease, confidence) in enumerate(sorted_diseases):
+                    with cols_rek[idx % 3]:
+                        st.metric(
+                            label=_label(disease),
+                            value=f"{int(confidence * 100)}%",
+                            help="Впевненість AWS Rekognition Custom Labels"
+                        )
+
+        # Display Rekognition standard features
+        if rekognition_features:
+            st.markdown("### 📸 AWS Rekognition - Виявлені ознаки")
+            cols_feat = st.columns(min(len(rekognition_features), 4))
+            for idx, (feat, conf) in enumerate(sorted(rekognition_features.items(), key=_by_value, reverse=True)):
+                with cols_feat[idx % 4]:
+                    st.metric(
+                        label=_label(feat),
+                        value=f"{int(conf * 100)}%",
+                        help="Впевненість виявлення"
+                    )
+
+        # Display other features in expander
+        if other_features:
+            with st.expander("🔍 Додаткові візуальні ознаки"):
+                for feat, val in sorted(other_features.items(), key=_by_value, reverse=True):
+                    st.write(f"**{_label(feat)}**: {val:.2f}")
+
+        st.divider()
+
+    # Display top candidate only
+    st.subheader("🔍 Діагноз")
+
+    candidates = body.get("candidates", [])
+    if candidates:
+        # Show only the top candidate
+        c = candidates[0]
+        with st.container(border=True):
+            col_a, col_b = st.columns([3, 1])
+            with col_a:
+                st.markdown(f"### {c['disease']}")
+            with col_b:
+                score_pct = int(c['score'] * 100)
+                st.metric("Точність", f"{score_pct}%")
+
+            st.markdown(f"**Обґрунтування:** {c.get('rationale', 'Немає обґрунтування')}")
+
+            kb = c.get("kb_refs") or []
+            if kb:
+                kb_titles = ", ".join([k.get("title", "") for k in kb])
+                st.caption(f"📚 База знань: {kb_titles}")
+    else:
+        st.warning("⚠️ Не знайдено можливих діагнозів")
+
+    # Display action plan
+    st.subheader("📋 План дій")
+    plan = body.get("plan", {}) or {}
+
+    col_plan1, col_plan2 = st.columns(2)
+
+    with col_plan1:
+        # Diagnostics
+        st.markdown("**🔬 Діагностичні заходи**")
+        st.markdown(_mdlist(plan.get("diagnostics", [])))
+
+        st.divider()
+
+        # Agronomy
+        st.markdown("**🌾 Агротехнічні заходи**")
+        st.markdown(_mdlist(plan.get("agronomy", [])))
+
+    with col_plan2:
+        # Chemical
+        st.markdown("**⚗️ Хімічний захист**")
+        st.markdown(_mdlist(plan.get("chemical", [])))
+
+        st.divider()
+
+        # Bio
+        st.markdown("**🌿 Біологічний захист**")
+        st.markdown(_mdlist(plan.get("bio", [])))
+
+    # Disclaimers
+    st.divider()
+    for d in body.get("disclaimers", []):
+        st.warning(d)
+
+    # Debug info (collapsible)
+    debug = body.get("debug") or {}
+    if debug:
+        with st.expander("🔧 Технічна інформація"):
+            col_d1, col_d2 = st.columns(2)
+
+            with col_d1:
+                st.code(_json_text(debug.get("timings", {})), language="json")
+
+            with col_d2:
+                st.code(_json_text(debug.get("components", {})), language="json")
+
+            workspace_path = debug.get("workspace_path")
+            if workspace_path:
+                st.caption(f"📁 Дані збережено: `{workspace_path}`")
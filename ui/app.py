@@ -1,6 +1,28 @@
 import streamlit as st
-import requests
+import hashlib
 import os
+import time
+
+from _diag import (
+    COMPRESS_MIN_BYTES,
+    DIAG_CACHE_SIZE,
+    DIAG_POLL_S,
+    DIAG_TIMEOUT_S,
+    build_form_data,
+    GROWTH_STAGES,
+    MAX_UPLOAD_FILES,
+    MAX_UPLOAD_MB,
+    PREVIEW_WIDTH,
+    UPLOAD_MAX_SIDE,
+    get_crops,
+    get_executor,
+    get_http_client,
+    load_css,
+    make_thumb,
+    render_result,
+    resolve_backend_url,
+    upload_part,
+)
 
 # Page configuration
 st.set_page_config(
@@ -11,87 +33,7 @@ st.set_page_config(
 )
 
 # Enhanced CSS matching About Us page
-st.markdown("""
-<style>
-    /* App background */
-    .stApp {
-        background-color: black;
-    }
-
-    /* Main title styling */
-    .main-title {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: #2e7d32;
-        text-align: center;
-        margin-bottom: 0.5rem;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-
-    .subtitle {
-        text-align: center;
-        color: #666;
-        font-size: 1.1rem;
-        margin-bottom: 2rem;
-    }
-
-    /* Button styling */
-    .stButton > button {
-        background: linear-gradient(135deg, #4caf50 0%, #388e3c 100%);
-        color: white;
-        border-radius: 8px;
-        padding: 0.5rem 1rem;
-        border: none;
-        font-weight: 600;
-        transition: transform 0.2s ease;
-    }
-
-    .stButton > button:hover {
-        background: linear-gradient(135deg, #388e3c 0%, #2e7d32 100%);
-        transform: translateY(-2px);
-    }
-
-    /* Feature card styling */
-    .feature-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: black;
-        padding: 1.5rem;
-        border-radius: 12px;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.2);
-        margin: 0.5rem 0;
-    }
-
-    /* Info box styling */
-    .info-box {
-        background: black;
-        padding: 1.5rem;
-        border-radius: 12px;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        border-left: 4px solid #4caf50;
-        margin: 1rem 0;
-    }
-
-    /* Recognition result box */
-    .recognition-box {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 0.5rem 0;
-    }
-
-    .recognition-item {
-        display: flex;
-        justify-content: space-between;
-        padding: 0.5rem;
-        border-bottom: 1px solid rgba(255,255,255,0.2);
-    }
-
-    .recognition-item:last-child {
-        border-bottom: none;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(load_css("app.css"), unsafe_allow_html=True)
 
 # Main title
 st.markdown('<h1 class="main-title">🌿 AgroDiag — Система попередньої діагностики</h1>', unsafe_allow_html=True)
@@ -104,10 +46,11 @@ with st.sidebar:
     # Backend URL
     backend_url = st.text_input(
         "Backend URL",
-        value="http://127.0.0.1:8000",
+        value=resolve_backend_url(),
         help="🔗 Базова адреса FastAPI сервера (без /v1/diagnose в кінці)",
     )
-    diag_endpoint = backend_url.rstrip("/") + "/v1/diagnose"
+    base_url = backend_url.rstrip("/")
+    diag_endpoint = base_url + "/v1/diagnose"
 
     st.divider()
 
@@ -126,6 +69,12 @@ with st.sidebar:
         help="🧠 Використовувати AWS Bedrock для розширеного аналізу (замість стандартного LLM). Потребує налаштувань AWS"
     )
 
+    compress_images = st.checkbox(
+        "Стиснути зображення перед відправкою",
+        value=True,
+        help=f"📉 Зменшити фото до {UPLOAD_MAX_SIDE}px та JPEG перед завантаженням (файли понад {COMPRESS_MIN_BYTES // 1024} КБ)"
+    )
+
     st.divider()
 
     # Info section
@@ -155,7 +104,7 @@ with st.form("diag_form", clear_on_submit=False):
     with col1:
         crop = st.selectbox(
             "🌾 Культура *",
-            ["tomato", "potato", "pepper", "cucumber", "onion", "garlic", "cabbage", "carrot", "beet", "wheat"],
+            get_crops(base_url),
             index=0,
             help="Виберіть культуру, яку потрібно діагностувати"
         )
@@ -163,7 +112,7 @@ with st.form("diag_form", clear_on_submit=False):
     with col2:
         growth_stage = st.selectbox(
             "🌱 Стадія росту",
-            ["", "seedling", "vegetative", "flowering", "fruiting", "tubering", "tuber_development"],
+            GROWTH_STAGES,
             index=0,
             help="Опціонально: виберіть поточну стадію росту рослини для більш точної діагностики"
         )
@@ -202,245 +151,121 @@ with st.form("diag_form", clear_on_submit=False):
         "📸 Зображення рослин",
         accept_multiple_files=True,
         type=["png", "jpg", "jpeg", "webp"],
-        help="📤 Завантажте до 4 фотографій симптомів (PNG, JPG, WEBP). Краща якість фото = точніша діагностика"
+        help=f"📤 Завантажте до {MAX_UPLOAD_FILES} фотографій симптомів (PNG, JPG, WEBP). Краща якість фото = точніша діагностика"
+    )
+
+    # Enforce the limits before anything reads the files: only these are
+    # previewed, hashed and uploaded
+    if images and len(images) > MAX_UPLOAD_FILES:
+        st.warning(f"⚠️ Використано лише перші {MAX_UPLOAD_FILES} файли")
+        images = images[:MAX_UPLOAD_FILES]
+    oversized = [img.name for img in images or [] if img.size > MAX_UPLOAD_MB * 1024 * 1024]
+    if oversized:
+        st.warning(f"⚠️ Файли понад {MAX_UPLOAD_MB} МБ пропущено: {', '.join(oversized)}")
+        images = [img for img in images if img.size <= MAX_UPLOAD_MB * 1024 * 1024]
+
+    # One content digest per image, shared by the thumbnail and result caches
+    image_hashes = tuple(
+        hashlib.blake2b(img.getvalue(), digest_size=16).hexdigest() for img in images or []
     )
 
     if images:
         st.caption(f"✅ Завантажено файлів: {len(images)}")
-        cols = st.columns(min(len(images), 4))
-        for idx, img in enumerate(images[:4]):
-            with cols[idx]:
-                st.image(img, caption=img.name, use_container_width=True)
+        thumbs = [make_thumb(digest, img.getvalue()) for digest, img in zip(image_hashes, images)]
+        # One element for the whole row instead of a column + image per file
+        st.image(thumbs, caption=[img.name for img in images], width=PREVIEW_WIDTH)
 
     # Submit button
     submitted = st.form_submit_button("🔬 Діагностувати", use_container_width=True)
 
-# Handle form submission
+# Handle form submission: the request runs in a worker thread and the script
+# reruns to poll it, so the page stays responsive while the backend works
 if submitted:
     if not symptoms_text or len(symptoms_text.strip()) < 5:
         st.error("❌ Будь ласка, заповніть поле 'Опис симптомів' (мінімум 5 символів)")
     else:
+        # Prepare request data (reused when the form inputs have not changed)
+        form_key = (crop, symptoms_text, growth_stage, lat, lon)
+        if st.session_state.get("diag_form_key") != form_key:
+            st.session_state.diag_form_data = build_form_data(*form_key)
+            st.session_state.diag_form_key = form_key
+        data, notices = st.session_state.diag_form_data
+
+        # Add feature flags as headers (optional backend implementation)
+        headers = {}
+        if use_rekognition:
+            headers["X-Use-Rekognition"] = "true"
+        if use_bedrock:
+            headers["X-Use-Bedrock"] = "true"
+
+        # Identical inputs (same fields, flags, compression and image
+        # contents) reuse the earlier result instead of re-running the diagnosis
+        cache_key = (
+            diag_endpoint, tuple(data.items()), tuple(headers.items()), compress_images, image_hashes
+        )
+        cached = st.session_state.get("diag_cache", {}).get(cache_key)
+
+        st.session_state.diag_notices = notices
+        if cached is not None:
+            st.session_state.diag_result = cached
+            # Drop any request still in flight so it can't overwrite this result
+            st.session_state.pop("diag_job", None)
+            st.session_state.pop("diag_job_key", None)
+        else:
+            # Prepare images: pass the uploaded file objects so httpx streams
+            # them into the multipart body instead of copying them to bytes
+            files = [("images", upload_part(img, compress_images)) for img in images or []]
+
+            st.session_state.diag_job = get_executor().submit(
+                get_http_client().post,
+                diag_endpoint,
+                data=data,
+                files=files,
+                headers=headers,
+                timeout=DIAG_TIMEOUT_S,
+            )
+            st.session_state.diag_job_key = cache_key
+            st.session_state.pop("diag_result", None)
+
+for notice in st.session_state.get("diag_notices", []):
+    st.warning(notice)
+
+job = st.session_state.get("diag_job")
+if job is not None:
+    if not job.done():
         with st.spinner("⏳ Опрацьовуємо запит... Це може зайняти кілька секунд"):
-            # Prepare request data
-            data = {
-                "crop": crop,
-                "symptoms_text": symptoms_text,
-                "growth_stage": growth_stage or "",
-            }
-
-            # Add location if provided
-            if lat and lon:
-                try:
-                    data["lat"] = float(lat)
-                    data["lon"] = float(lon)
-                except ValueError:
-                    st.warning("⚠️ Некоректні координати. Діагностика буде проведена без врахування локації.")
-
-            # Prepare images
-            files = []
-            for img in images or []:
-                files.append(
-                    (
-                        "images",
-                        (img.name, img.getvalue(), img.type or "application/octet-stream"),
-                    )
-                )
-
-            # Add feature flags as headers (optional backend implementation)
-            headers = {}
-            if use_rekognition:
-                headers["X-Use-Rekognition"] = "true"
-            if use_bedrock:
-                headers["X-Use-Bedrock"] = "true"
-
-            try:
-                # Make request to backend
-                res = requests.post(
-                    diag_endpoint,
-                    data=data,
-                    files=files,
-                    headers=headers,
-                    timeout=60
-                )
-
-                if res.status_code != 200:
-                    st.error(f"❌ Помилка {res.status_code}: {res.text[:500]}")
-                else:
-                    body = res.json()
-
-                    # Success message
-                    st.success("✅ Діагностика завершена успішно!")
-
-                    # Case ID
-                    st.code(f"🆔 Case ID: {body.get('case_id')}", language="text")
-
-                    # Display visual features (Recognition results) if available
-                    visual_feats = body.get("visual_features", {})
-                    if visual_feats:
-                        st.subheader("🔬 Результати аналізу зображень")
-
-                        # Separate Rekognition disease detections from other features
-                        rekognition_diseases = {}
-                        rekognition_features = {}
-                        other_features = {}
-
-                        for key, value in visual_feats.items():
-                            if key.startswith('_'):
-                                continue  # Skip internal/debug features
-                            elif key.endswith('_rek'):
-                                # Rekognition standard label features
-                                rekognition_features[key.replace('_rek', '')] = value
-                            elif not any(x in key for x in ['img', 'white_like', 'very_dark', 'edges_mean']):
-                                # Likely a disease name from Custom Labels
-                                # Check if it looks like a disease (not a basic feature)
-                                if key not in ['lesion_spots', 'white_powder', 'downy_mildew', 'wilting', 'yellowing', 'black_spots', 'water_soaked']:
-                                    rekognition_diseases[key] = value
-                                else:
-                                    other_features[key] = value
-                            else:
-                                other_features[key] = value
-
-                        # Display Rekognition Custom Labels (disease detections) prominently
-                        if rekognition_diseases:
-                            st.markdown("### 🎯 AWS Rekognition - Виявлені захворювання")
-                            st.markdown("""
-                            <div class="feature-card">
-                                <p><strong>Результати Custom Labels моделі:</strong></p>
-                            </div>
-                            """, unsafe_allow_html=True)
-
-                            # Sort by confidence (highest first)
-                            sorted_diseases = sorted(rekognition_diseases.items(), key=lambda x: x[1], reverse=True)
-
-                            cols_rek = st.columns(min(len(sorted_diseases), 3))
-                            for idx, (disease, confidence) in enumerate(sorted_diseases):
-                                with cols_rek[idx % 3]:
-                                    st.metric(
-                                        label=disease.replace('_', ' ').title(),
-                                        value=f"{int(confidence * 100)}%",
-                                        help="Впевненість AWS Rekognition Custom Labels"
-                                    )
-
-                        # Display Rekognition standard features
-                        if rekognition_features:
-                            st.markdown("### 📸 AWS Rekognition - Виявлені ознаки")
-                            cols_feat = st.columns(min(len(rekognition_features), 4))
-                            for idx, (feat, conf) in enumerate(sorted(rekognition_features.items(), key=lambda x: x[1], reverse=True)):
-                                with cols_feat[idx % 4]:
-                                    st.metric(
-                                        label=feat.replace('_', ' ').title(),
-                                        value=f"{int(conf * 100)}%",
-                                        help="Впевненість виявлення"
-                                    )
-
-                        # Display other features in expander
-                        if other_features:
-                            with st.expander("🔍 Додаткові візуальні ознаки"):
-                                for feat, val in sorted(other_features.items(), key=lambda x: x[1], reverse=True):
-                                    if not feat.startswith('_'):
-                                        st.write(f"**{feat.replace('_', ' ').title()}**: {val:.2f}")
-
-                        st.divider()
-
-                    # Display top candidate only
-                    st.subheader("🔍 Діагноз")
-
-                    candidates = body.get("candidates", [])
-                    if candidates:
-                        # Show only the top candidate
-                        c = candidates[0]
-                        with st.container(border=True):
-                            col_a, col_b = st.columns([3, 1])
-                            with col_a:
-                                st.markdown(f"### {c['disease']}")
-                            with col_b:
-                                score_pct = int(c['score'] * 100)
-                                st.metric("Точність", f"{score_pct}%")
-
-                            st.markdown(f"**Обґрунтування:** {c.get('rationale', 'Немає обґрунтування')}")
-
-                            kb = c.get("kb_refs") or []
-                            if kb:
-                                kb_titles = ", ".join([k.get("title", "") for k in kb])
-                                st.caption(f"📚 База знань: {kb_titles}")
-                    else:
-                        st.warning("⚠️ Не знайдено можливих діагнозів")
-
-                    # Display action plan
-                    st.subheader("📋 План дій")
-                    plan = body.get("plan", {}) or {}
-
-                    col_plan1, col_plan2 = st.columns(2)
-
-                    with col_plan1:
-                        # Diagnostics
-                        st.markdown("**🔬 Діагностичні заходи**")
-                        diagnostics = plan.get("diagnostics", [])
-                        if diagnostics:
-                            for i, t in enumerate(diagnostics, 1):
-                                st.write(f"{i}. {t}")
-                        else:
-                            st.caption("Немає рекомендацій")
-
-                        st.divider()
-
-                        # Agronomy
-                        st.markdown("**🌾 Агротехнічні заходи**")
-                        agronomy = plan.get("agronomy", [])
-                        if agronomy:
-                            for i, t in enumerate(agronomy, 1):
-                                st.write(f"{i}. {t}")
-                        else:
-                            st.caption("Немає рекомендацій")
-
-                    with col_plan2:
-                        # Chemical
-                        st.markdown("**⚗️ Хімічний захист**")
-                        chemical = plan.get("chemical", [])
-                        if chemical:
-                            for i, t in enumerate(chemical, 1):
-                                st.write(f"{i}. {t}")
-                        else:
-                            st.caption("Немає рекомендацій")
-
-                        st.divider()
-
-                        # Bio
-                        st.markdown("**🌿 Біологічний захист**")
-                        bio = plan.get("bio", [])
-                        if bio:
-                            for i, t in enumerate(bio, 1):
-                                st.write(f"{i}. {t}")
-                        else:
-                            st.caption("Немає рекомендацій")
-
-                    # Disclaimers
-                    st.divider()
-                    for d in body.get("disclaimers", []):
-                        st.warning(d)
-
-                    # Debug info (collapsible)
-                    debug = body.get("debug") or {}
-                    if debug:
-                        with st.expander("🔧 Технічна інформація"):
-                            col_d1, col_d2 = st.columns(2)
-
-                            with col_d1:
-                                st.json(debug.get("timings", {}))
-
-                            with col_d2:
-                                st.json(debug.get("components", {}))
-
-                            if debug.get("workspace_path"):
-                                st.caption(f"📁 Дані збережено: `{debug.get('workspace_path')}`")
-
-            except requests.exceptions.Timeout:
-                st.error("⏱️ Запит перевищив час очікування. Спробуйте ще раз.")
-            except requests.exceptions.ConnectionError:
-                st.error("🔌 Не вдалося підключитися до сервера. Переконайтеся, що Backend запущено.")
-            except Exception as e:
-                st.error(f"❌ Непередбачена помилка: {str(e)}")
-                st.exception(e)
+            time.sleep(DIAG_POLL_S)
+        st.rerun()
+
+    import httpx
+    import orjson
+
+    # The job and its cache key are cleared together on every outcome, so a
+    # failed request never leaves a stale key behind for the next submit
+    del st.session_state.diag_job
+    job_key = st.session_state.pop("diag_job_key", None)
+    try:
+        res = job.result()
+        if res.status_code != 200:
+            st.error(f"❌ Помилка {res.status_code}: {res.text[:500]}")
+        else:
+            body = orjson.loads(res.content)
+            st.session_state.diag_result = body
+            cache = st.session_state.setdefault("diag_cache", {})
+            if len(cache) >= DIAG_CACHE_SIZE:
+                cache.pop(next(iter(cache)))  # drop the oldest entry
+            cache[job_key] = body
+    except httpx.TimeoutException:
+        st.error("⏱️ Запит перевищив час очікування. Спробуйте ще раз.")
+    except httpx.TransportError:
+        st.error("🔌 Не вдалося підключитися до сервера. Переконайтеся, що Backend запущено.")
+    except httpx.HTTPError as e:
+        st.error(f"❌ Помилка запиту: {e}")
+    except orjson.JSONDecodeError:
+        st.error("❌ Сервер повернув некоректну відповідь (не JSON).")
+
+if st.session_state.get("diag_result"):
+    render_result(st.session_state.diag_result)
 
 # Footer
 st.divider()
@@ -1,7 +1,13 @@
+import asyncio
+from collections import Counter
+
 import streamlit as st
-import requests
+import httpx
+import orjson
 from datetime import datetime
 
+from _diag import get_crops, load_css  # shared, cached helpers
+
 # Page configuration
 st.set_page_config(
     page_title="Історія діагностик — AgroDiag",
@@ -9,60 +15,193 @@ st.set_page_config(
     layout="wide",
 )
 
+CASES_PAGE_SIZE = 15
+
 # Custom CSS for styling
-st.markdown("""
-<style>
-    .main-title {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: #2e7d32;
-        text-align: center;
-        margin-bottom: 0.5rem;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-
-    .subtitle {
-        text-align: center;
-        color: #666;
-        font-size: 1.1rem;
-        margin-bottom: 2rem;
-    }
-
-    .case-card {
-        background: white;
-        padding: 1.5rem;
-        border-radius: 12px;
-        border-left: 5px solid #4caf50;
-        margin-bottom: 1rem;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        transition: all 0.3s ease;
-    }
-
-    .case-card:hover {
-        box-shadow: 0 4px 16px rgba(0,0,0,0.2);
-        transform: translateX(5px);
-    }
-
-    .stat-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 1.5rem;
-        border-radius: 10px;
-        text-align: center;
-        box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-    }
-
-    .stat-number {
-        font-size: 2.5rem;
-        font-weight: 700;
-    }
-
-    .stat-label {
-        font-size: 0.9rem;
-        opacity: 0.9;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(load_css("history.css"), unsafe_allow_html=True)
+
+@st.cache_resource
+def _client() -> httpx.Client:
+    """Pooled keep-alive client shared by every list fetch."""
+    return httpx.Client(
+        timeout=30,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    )
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_cases(cases_endpoint: str, limit: int, date_iso, search: str = "", crop=None):
+    """GET /v1/cases as (cases, total); filtering happens on the server, errors raise and are not cached."""
+    params = {"limit": limit}
+    if date_iso:
+        params["date"] = date_iso
+    if search:
+        params["search"] = search
+    if crop:
+        params["crop"] = crop
+    res = _client().get(cases_endpoint, params=params)
+    res.raise_for_status()
+    data = orjson.loads(res.content)
+    return data.get("cases", []), data.get("total", 0)
+
+
+async def _fetch_case_details(base_url: str, case_ids: list) -> list:
+    """
+    GET /v1/cases/{id} for all ids concurrently; failures are returned, not raised.
+
+    The AsyncClient lives for one batch: it is bound to the event loop that
+    asyncio.run() creates, so it cannot be cached across reruns.
+    """
+    async def fetch(client, case_id):
+        res = await client.get(f"{base_url}/v1/cases/{case_id}")
+        if res.status_code == 404:
+            return None
+        res.raise_for_status()
+        return orjson.loads(res.content)
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        return await asyncio.gather(
+            *(fetch(client, case_id) for case_id in case_ids), return_exceptions=True
+        )
+
+
+def get_case_details(base_url: str, case_ids: list) -> dict:
+    """
+    Details for the given cases, keyed by case_id.
+
+    Stored cases never change, so successful results are kept for the whole
+    browser session and only the missing ones are fetched (in one batch).
+    """
+    cache = st.session_state.setdefault("case_details", {})
+    missing = [cid for cid in case_ids if (base_url, cid) not in cache]
+    errors = {}
+    if missing:
+        results = asyncio.run(_fetch_case_details(base_url, missing))
+        for case_id, result in zip(missing, results):
+            if isinstance(result, Exception):
+                errors[case_id] = result  # not cached: retried on the next rerun
+            else:
+                cache[(base_url, case_id)] = result
+    return {cid: errors.get(cid, cache.get((base_url, cid))) for cid in case_ids}
+
+
+def _open_details(case_id: str) -> None:
+    st.session_state[f"show_details_{case_id}"] = True
+
+
+def _close_details(case_id: str) -> None:
+    st.session_state[f"show_details_{case_id}"] = False
+
+
+@st.fragment
+def render_case(case: dict, base_url: str) -> None:
+    """
+    One case card with its details panel.
+
+    A fragment, so the card's own buttons rerun only this card instead of
+    the whole page (cases fetch, stats and every other card).
+    """
+    case_id = case.get("case_id", "unknown")
+    crop = case.get("crop", "unknown")
+    date = case.get("date", "unknown")
+    symptoms_preview = case.get("symptoms_preview", "")
+
+    with st.container(border=True):
+        col_info, col_btn = st.columns([5, 1])
+
+        with col_info:
+            # All static card text in one element
+            st.markdown(
+                f"**🆔 Case ID:** `{case_id[:8]}...` · **🌾 Культура:** {crop} · **📅 Дата:** {date}  \n"
+                f"**Симптоми:** {symptoms_preview}..."
+            )
+
+        with col_btn:
+            # View details button
+            # (a callback, so the flag is set before the card renders)
+            st.button(
+                "👁️ Деталі",
+                key=f"view_{case_id}",
+                on_click=_open_details,
+                args=(case_id,),
+                use_container_width=True,
+            )
+
+        # Show details if button clicked
+        if st.session_state.get(f"show_details_{case_id}", False):
+            st.divider()
+
+            with st.spinner("Завантажуємо деталі..."):
+                try:
+                    # Served from the session cache when the page-level batch
+                    # already fetched it; fetched here when opened in this fragment
+                    detail_data = get_case_details(base_url, [case_id])[case_id]
+                    if isinstance(detail_data, Exception):
+                        raise detail_data
+                    if detail_data is not None:
+                        # Display full diagnosis
+                        st.markdown("#### 🔍 Повна діагностика")
+
+                        # Candidates
+                        candidates = detail_data.get("candidates", [])
+                        if candidates:
+                            st.markdown("**Можливі діагнози:**")
+                            for idx, c in enumerate(candidates, 1):
+                                col_a, col_b = st.columns([3, 1])
+                                with col_a:
+                                    st.write(f"{idx}. **{c.get('disease', 'N/A')}**")
+                                    st.caption(c.get('rationale', ''))
+                                with col_b:
+                                    score_pct = int(c.get('score', 0) * 100)
+                                    st.metric("Точність", f"{score_pct}%")
+
+                        # Action plan
+                        plan = detail_data.get("plan", {})
+                        if plan:
+                            st.markdown("**📋 План дій:**")
+                            col_p1, col_p2 = st.columns(2)
+
+                            with col_p1:
+                                diagnostics = plan.get("diagnostics", [])
+                                if diagnostics:
+                                    st.markdown("*Діагностичні заходи:*")
+                                    for d in diagnostics:
+                                        st.write(f"- {d}")
+
+                                agronomy = plan.get("agronomy", [])
+                                if agronomy:
+                                    st.markdown("*Агротехнічні заходи:*")
+                                    for a in agronomy:
+                                        st.write(f"- {a}")
+
+                            with col_p2:
+                                chemical = plan.get("chemical", [])
+                                if chemical:
+                                    st.markdown("*Хімічний захист:*")
+                                    for ch in chemical:
+                                        st.write(f"- {ch}")
+
+                                bio = plan.get("bio", [])
+                                if bio:
+                                    st.markdown("*Біологічний захист:*")
+                                    for b in bio:
+                                        st.write(f"- {b}")
+
+                        # Close button (the callback runs before the
+                        # click's own rerun, so no second rerun is needed)
+                        st.button(
+                            "❌ Закрити",
+                            key=f"close_{case_id}",
+                            on_click=_close_details,
+                            args=(case_id,),
+                        )
+
+                    else:
+                        st.error("Не вдалося завантажити деталі: кейс не знайдено")
+
+                except Exception as e:
+                    st.error(f"Помилка: {str(e)}")
+
 
 # Main title
 st.markdown('<h1 class="main-title">📊 Історія діагностик</h1>', unsafe_allow_html=True)
@@ -89,6 +228,15 @@ with st.sidebar:
         help="Фільтрувати по даті (залиште порожнім для всіх)"
     )
 
+    crop_filter = st.selectbox(
+        "Культура",
+        [None, *get_crops(backend_url.rstrip("/"))],
+        format_func=lambda c: "Всі" if c is None else c,
+        help="Фільтрувати по культурі",
+    )
+
+    search_query = st.text_input("🔍 Пошук по симптомам", placeholder="Введіть ключові слова...").strip()
+
     limit = st.slider(
         "Кількість записів",
         min_value=10,
@@ -98,179 +246,105 @@ with st.sidebar:
         help="Максимальна кількість діагностик для відображення"
     )
 
+    if st.button("🔄 Оновити", help="Завантажити свіжий список діагностик", use_container_width=True):
+        fetch_cases.clear()
+
     st.divider()
 
     with st.expander("ℹ️ Про історію"):
         st.markdown("""
         На цій сторінці ви можете:
         - 📋 Переглянути всі діагностики
-        - 🔍 Фільтрувати по даті
+        - 🔍 Фільтрувати по даті, культурі та симптомам
         - 📊 Переглянути деталі кожної діагностики
         - 🔄 Порівняти результати
         """)
 
 # Prepare API endpoint
-cases_endpoint = backend_url.rstrip("/") + "/v1/cases"
+base_url = backend_url.rstrip("/")
+cases_endpoint = base_url + "/v1/cases"
 
 # Fetch cases
 with st.spinner("⏳ Завантажуємо історію діагностик..."):
     try:
-        params = {"limit": limit}
-        if date_filter:
-            params["date"] = date_filter.isoformat()
-
-        res = requests.get(cases_endpoint, params=params, timeout=30)
-
-        if res.status_code != 200:
-            st.error(f"❌ Помилка {res.status_code}: {res.text[:500]}")
-        else:
-            data = res.json()
-            cases = data.get("cases", [])
-            total = data.get("total", 0)
-
-            # Display statistics
-            st.markdown("### 📈 Статистика")
-
-            col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
-
-            with col_stat1:
-                st.metric("📊 Всього діагностик", total)
-
-            with col_stat2:
-                # Count unique crops
-                unique_crops = len(set(c.get("crop", "") for c in cases))
-                st.metric("🌾 Культур", unique_crops)
-
-            with col_stat3:
-                # Count cases with specific crop
-                if cases:
-                    most_common_crop = max(set(c.get("crop", "") for c in cases), key=lambda x: sum(1 for c in cases if c.get("crop") == x))
-                    st.metric("🏆 Найчастіше", most_common_crop)
-                else:
-                    st.metric("🏆 Найчастіше", "N/A")
+        cases, total = fetch_cases(
+            cases_endpoint,
+            limit,
+            date_filter.isoformat() if date_filter else None,
+            search_query,
+            crop_filter,
+        )
+
+        # Display statistics
+        st.markdown("### 📈 Статистика")
+
+        col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
+        crop_counts = Counter(c.get("crop", "") for c in cases)
+
+        with col_stat1:
+            st.metric("📊 Всього діагностик", total)
+
+        with col_stat2:
+            # Count unique crops
+            st.metric("🌾 Культур", len(crop_counts))
+
+        with col_stat3:
+            # Most frequent crop
+            if crop_counts:
+                st.metric("🏆 Найчастіше", crop_counts.most_common(1)[0][0])
+            else:
+                st.metric("🏆 Найчастіше", "N/A")
 
-            with col_stat4:
-                # Today's cases
-                today_str = datetime.now().date().isoformat()
-                today_cases = sum(1 for c in cases if c.get("date", "") == today_str)
-                st.metric("📅 Сьогодні", today_cases)
+        with col_stat4:
+            # Today's cases
+            today_str = datetime.now().date().isoformat()
+            today_cases = sum(1 for c in cases if c.get("date", "") == today_str)
+            st.metric("📅 Сьогодні", today_cases)
 
-            st.divider()
+        st.divider()
 
-            # Display cases
-            if not cases:
-                st.info("📭 Історія діагностик порожня. Виконайте діагностику на головній сторінці!")
+        # Display cases
+        if not cases:
+            if search_query or crop_filter or date_filter:
+                st.info("🔍 За вибраними фільтрами діагностик не знайдено")
             else:
-                st.markdown(f"### 📋 Діагностики ({len(cases)})")
-
-                # Search box
-                search_query = st.text_input("🔍 Пошук по симптомам", placeholder="Введіть ключові слова...")
-
-                # Filter cases by search query
-                filtered_cases = cases
-                if search_query:
-                    filtered_cases = [
-                        c for c in cases
-                        if search_query.lower() in c.get("symptoms_preview", "").lower()
-                    ]
-
-                st.caption(f"Знайдено: {len(filtered_cases)} з {len(cases)}")
-
-                # Display each case
-                for case in filtered_cases:
-                    case_id = case.get("case_id", "unknown")
-                    crop = case.get("crop", "unknown")
-                    date = case.get("date", "unknown")
-                    symptoms_preview = case.get("symptoms_preview", "")
-
-                    with st.container(border=True):
-                        col1, col2, col3 = st.columns([3, 2, 1])
-
-                        with col1:
-                            st.markdown(f"**🆔 Case ID:** `{case_id[:8]}...`")
-                            st.caption(f"**Симптоми:** {symptoms_preview}...")
-
-                        with col2:
-                            st.markdown(f"**🌾 Культура:** {crop}")
-                            st.caption(f"**📅 Дата:** {date}")
-
-                        with col3:
-                            # View details button
-                            if st.button("👁️ Деталі", key=f"view_{case_id}", use_container_width=True):
-                                st.session_state[f"show_details_{case_id}"] = True
-
-                        # Show details if button clicked
-                        if st.session_state.get(f"show_details_{case_id}", False):
-                            st.divider()
-
-                            with st.spinner("Завантажуємо деталі..."):
-                                try:
-                                    detail_url = f"{backend_url.rstrip('/')}/v1/cases/{case_id}"
-                                    detail_res = requests.get(detail_url, timeout=30)
-
-                                    if detail_res.status_code == 200:
-                                        detail_data = detail_res.json()
-
-                                        # Display full diagnosis
-                                        st.markdown("#### 🔍 Повна діагностика")
-
-                                        # Candidates
-                                        candidates = detail_data.get("candidates", [])
-                                        if candidates:
-                                            st.markdown("**Можливі діагнози:**")
-                                            for idx, c in enumerate(candidates, 1):
-                                                col_a, col_b = st.columns([3, 1])
-                                                with col_a:
-                                                    st.write(f"{idx}. **{c.get('disease', 'N/A')}**")
-                                                    st.caption(c.get('rationale', ''))
-                                                with col_b:
-                                                    score_pct = int(c.get('score', 0) * 100)
-                                                    st.metric("Точність", f"{score_pct}%")
-
-                                        # Action plan
-                                        plan = detail_data.get("plan", {})
-                                        if plan:
-                                            st.markdown("**📋 План дій:**")
-                                            col_p1, col_p2 = st.columns(2)
-
-                                            with col_p1:
-                                                diagnostics = plan.get("diagnostics", [])
-                                                if diagnostics:
-                                                    st.markdown("*Діагностичні заходи:*")
-                                                    for d in diagnostics:
-                                                        st.write(f"- {d}")
-
-                                                agronomy = plan.get("agronomy", [])
-                                                if agronomy:
-                                                    st.markdown("*Агротехнічні заходи:*")
-                                                    for a in agronomy:
-                                                        st.write(f"- {a}")
-
-                                            with col_p2:
-                                                chemical = plan.get("chemical", [])
-                                                if chemical:
-                                                    st.markdown("*Хімічний захист:*")
-                                                    for ch in chemical:
-                                                        st.write(f"- {ch}")
-
-                                                bio = plan.get("bio", [])
-                                                if bio:
-                                                    st.markdown("*Біологічний захист:*")
-                                                    for b in bio:
-                                                        st.write(f"- {b}")
-
-                                        # Close button
-                                        if st.button("❌ Закрити", key=f"close_{case_id}"):
-                                            st.session_state[f"show_details_{case_id}"] = False
-                                            st.rerun()
-
-                                    else:
-                                        st.error(f"Не вдалося завантажити деталі: {detail_res.status_code}")
-
-                                except Exception as e:
-                                    st.error(f"Помилка: {str(e)}")
-
-    except requests.exceptions.ConnectionError:
+                st.info("📭 Історія діагностик порожня. Виконайте діагностику на головній сторінці!")
+        else:
+            st.markdown(f"### 📋 Діагностики ({len(cases)})")
+
+            # Paginate: only one page of case cards becomes widgets per rerun
+            page_count = max(1, -(-len(cases) // CASES_PAGE_SIZE))
+            if st.session_state.get("cases_page", 1) > page_count:
+                st.session_state["cases_page"] = page_count  # filter shrank the list
+            page = 1
+            if page_count > 1:
+                page = st.number_input(
+                    f"Сторінка (з {page_count})",
+                    min_value=1,
+                    max_value=page_count,
+                    step=1,
+                    key="cases_page",
+                )
+            page_start = (page - 1) * CASES_PAGE_SIZE
+            page_cases = cases[page_start:page_start + CASES_PAGE_SIZE]
+
+            # Warm the details cache for every open panel on this page in one
+            # concurrent batch; the cards below then read from it
+            open_ids = [
+                c.get("case_id", "unknown") for c in page_cases
+                if st.session_state.get(f"show_details_{c.get('case_id', 'unknown')}", False)
+            ]
+            if open_ids:
+                with st.spinner("Завантажуємо деталі..."):
+                    get_case_details(base_url, open_ids)
+
+            # Display each case on the current page
+            for case in page_cases:
+                render_case(case, base_url)
+
+    except httpx.HTTPStatusError as e:
+        st.error(f"❌ Помилка {e.response.status_code}: {e.response.text[:500]}")
+    except httpx.TransportError:
         st.error("🔌 Не вдалося підключитися до сервера. Переконайтеся, що Backend запущено.")
     except Exception as e:
         st.error(f"❌ Помилка: {str(e)}")
@@ -1,7 +1,20 @@
 import streamlit as st
+import hashlib
+import html
 import os
+import orjson
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import MappingProxyType
+
+from _diag import load_css  # shared, cached stylesheet loader
+
+# libyaml's C loader when PyYAML was built with it (the PyPI wheels are)
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
 
 # Page configuration
 st.set_page_config(
@@ -10,61 +23,55 @@ st.set_page_config(
     layout="wide",
 )
 
+KB_PAGE_SIZE = 10
+
+# Ukrainian labels for growth stages, shared by every disease card
+STAGE_NAMES = MappingProxyType({
+    "seedling": "Сходи",
+    "vegetative": "Вегетація",
+    "flowering": "Цвітіння",
+    "fruiting": "Плодоношення",
+    "tubering": "Бульбоутворення",
+    "tuber_development": "Розвиток бульб",
+})
+
 # Custom CSS for styling
-st.markdown("""
-<style>
-    .stApp {
-        background-color: black;
-    }
-
-    .main-title {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: #2e7d32;
-        text-align: center;
-        margin-bottom: 0.5rem;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-
-    .subtitle {
-        text-align: center;
-        color: #666;
-        font-size: 1.1rem;
-        margin-bottom: 2rem;
-    }
-
-    .disease-card {
-        background: white;
-        padding: 1.5rem;
-        border-radius: 12px;
-        border-left: 5px solid #ff9800;
-        margin-bottom: 1rem;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        transition: all 0.3s ease;
-    }
-
-    .disease-card:hover {
-        box-shadow: 0 4px 16px rgba(0,0,0,0.2);
-        transform: translateY(-3px);
-    }
-
-    .crop-badge {
-        display: inline-block;
-        background: linear-gradient(90deg, #4caf50 0%, #8bc34a 100%);
-        color: white;
-        padding: 0.5rem 1rem;
-        border-radius: 20px;
-        margin: 0.25rem;
-        font-weight: 600;
-        font-size: 0.9rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(load_css("knowledge_base.css"), unsafe_allow_html=True)
 
 # Main title
 st.markdown('<h1 class="main-title">📚 База знань про захворювання рослин</h1>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Інформація про підтримувані захворювання та культури</p>', unsafe_allow_html=True)
 
+KB_LOAD_WORKERS = 8
+# Parsed-KB snapshots (one per KB directory) live in the user cache, outside the source tree
+KB_SNAPSHOT_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "agrodiag"
+
+
+def _load_disease_file(pair):
+    """Parse one KB YAML file -> (path, data, error); runs in a worker thread."""
+    crop_name, yaml_file = pair
+    try:
+        with open(yaml_file, 'r', encoding='utf-8') as f:
+            disease_data = yaml.load(f, Loader=YamlLoader)
+    except Exception as e:
+        return yaml_file, None, e
+    if disease_data:
+        disease_data['crop'] = crop_name
+        disease_data['file_id'] = yaml_file.stem
+    return yaml_file, disease_data, None
+
+
+def _index_for_search(diseases):
+    """Attach a lowercase '_search' haystack (name, symptoms, visual patterns) to each entry."""
+    for d in diseases:
+        d["_search"] = "\n".join(
+            [str(d.get("name", ""))]
+            + [str(x) for x in d.get("symptoms") or []]
+            + [str(x) for x in d.get("visual_patterns") or []]
+        ).lower()
+    return diseases
+
+
 # Function to load knowledge base
 @st.cache_data
 def load_knowledge_base(kb_path):
@@ -83,24 +90,121 @@ def load_knowledge_base(kb_path):
         st.warning(f"❌ Шлях не знайдено: {kb_root}")
         return diseases
 
-    # Iterate through crop directories
-    for crop_dir in kb_root.iterdir():
-        if crop_dir.is_dir():
-            crop_name = crop_dir.name
-
-            # Load each disease YAML file
-            for yaml_file in crop_dir.glob("*.yaml"):
-                try:
-                    with open(yaml_file, 'r', encoding='utf-8') as f:
-                        disease_data = yaml.safe_load(f)
-                        if disease_data:
-                            disease_data['crop'] = crop_name
-                            disease_data['file_id'] = yaml_file.stem
-                            diseases.append(disease_data)
-                except Exception as e:
-                    st.warning(f"Could not load {yaml_file}: {e}")
+    # Every (crop, file) pair across the crop directories
+    crop_dirs = [crop_dir for crop_dir in kb_root.iterdir() if crop_dir.is_dir()]
+    paths = [
+        (crop_dir.name, yaml_file)
+        for crop_dir in crop_dirs
+        for yaml_file in crop_dir.glob("*.yaml")
+    ]
+
+    # Reuse the parsed snapshot only while the KB fingerprint (every file's
+    # name, size and mtime) is unchanged, so added, removed or replaced
+    # files invalidate it even when their mtime goes backwards
+    root_key = str(kb_root.resolve()).encode()
+    snapshot = KB_SNAPSHOT_DIR / f"kb_{hashlib.blake2b(root_key, digest_size=8).hexdigest()}.json"
+    fingerprint = hashlib.blake2b(digest_size=16)
+    for _, yaml_file in sorted(paths):
+        stat = yaml_file.stat()
+        fingerprint.update(f"{yaml_file.relative_to(kb_root)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    fingerprint = fingerprint.hexdigest()
+    try:
+        cached = orjson.loads(snapshot.read_bytes())
+        if cached.get("fingerprint") == fingerprint:
+            return _index_for_search(cached["diseases"])
+    except (OSError, orjson.JSONDecodeError, AttributeError, KeyError):
+        pass  # missing, unreadable or old format: rebuild from YAML
+
+    # Open + parse the files in parallel; map() keeps the original order
+    failed = False
+    with ThreadPoolExecutor(max_workers=KB_LOAD_WORKERS) as ex:
+        for yaml_file, disease_data, error in ex.map(_load_disease_file, paths):
+            if error is not None:
+                failed = True
+                st.warning(f"Could not load {yaml_file}: {error}")
+            elif disease_data:
+                diseases.append(disease_data)
+
+    # Only snapshot a complete load; an unwritable cache dir just skips it
+    if not failed:
+        try:
+            KB_SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+            snapshot.write_bytes(orjson.dumps({"fingerprint": fingerprint, "diseases": diseases}))
+        except (OSError, TypeError):
+            pass
+
+    return _index_for_search(diseases)
+
+def _toggle(key: str) -> None:
+    st.session_state[key] = not st.session_state.get(key, False)
+
+
+def _show_more(key: str) -> None:
+    st.session_state[key] = st.session_state.get(key, KB_PAGE_SIZE) + KB_PAGE_SIZE
+
+
+def _md_section(title: str, items) -> str:
+    """Bold title plus a bullet list, or '' when there are no items."""
+    if not items:
+        return ""
+    return f"**{title}**\n\n" + "\n".join(f"- {item}" for item in items)
+
+
+def render_disease_card(disease: dict) -> None:
+    """
+    Render one knowledge-base disease entry.
+
+    Static text is joined into one markdown element per block (header, two
+    action columns) rather than one element per line.
+    """
+    name = disease.get("name", "Unknown")
+    symptoms = disease.get("symptoms", [])
+    visual_patterns = disease.get("visual_patterns", [])
+    crops_supported = disease.get("crops_supported", [])
+    stage_window = disease.get("stage_window", [])
+    actions = disease.get("actions", {})
+
+    # The header block is rendered with unsafe_allow_html for the crop
+    # badges, so every KB-provided string in it is HTML-escaped
+    def esc(value) -> str:
+        return html.escape(str(value))
+
+    # Disease name and crop badges
+    badges = " ".join(
+        f'<span class="crop-badge">{esc(crop_name)}</span>'
+        for crop_name in crops_supported
+    )
+    parts = [f"### {esc(name)}", f"**Культури:** {badges}"]
+
+    # Stage window
+    if stage_window:
+        stages_translated = [esc(STAGE_NAMES.get(s, s)) for s in stage_window]
+        parts.append(f"**📅 Стадії росту (вікно уразливості):**\n\n🌱 {', '.join(stages_translated)}")
+
+    parts.append("---")
+    parts.append(_md_section("🔬 Симптоми:", [esc(s) for s in symptoms]))
+    parts.append(_md_section("👁️ Візуальні ознаки:", [esc(v) for v in visual_patterns]))
+    if actions:
+        parts.append("**📋 План дій:**")
+
+    with st.container(border=True):
+        st.markdown("\n\n".join(p for p in parts if p), unsafe_allow_html=True)
+
+        # Actions (plan)
+        if actions:
+            col_a1, col_a2 = st.columns(2)
+            col_a1.markdown("\n\n".join(filter(None, [
+                _md_section("🔬 Діагностичні заходи:", actions.get("diagnostics", [])),
+                _md_section("🌾 Агротехнічні заходи:", actions.get("agronomy", [])),
+            ])))
+            col_a2.markdown("\n\n".join(filter(None, [
+                _md_section("⚗️ Хімічний захист:", actions.get("chemical", [])),
+                _md_section("🌿 Біологічний захист:", actions.get("bio", [])),
+            ])))
+
+        # File info
+        st.caption(f"📄 Файл: `{disease.get('file_id', 'unknown')}.yaml`")
 
-    return diseases
 
 # Sidebar
 with st.sidebar:
@@ -161,12 +265,18 @@ else:
 
     # Filter by search query
     if search_query:
-        diseases = [
-            d for d in diseases
-            if search_query.lower() in d.get("name", "").lower()
-            or search_query.lower() in str(d.get("symptoms", [])).lower()
-            or search_query.lower() in str(d.get("visual_patterns", [])).lower()
-        ]
+        q = search_query.lower()
+        diseases = [d for d in diseases if q in d["_search"]]
+
+    # Group by crop and count in one pass over the filtered entries
+    diseases_by_crop = {}
+    with_symptoms = with_actions = 0
+    for disease in diseases:
+        diseases_by_crop.setdefault(disease.get("crop", "unknown"), []).append(disease)
+        if disease.get("symptoms"):
+            with_symptoms += 1
+        if disease.get("actions"):
+            with_actions += 1
 
     # Statistics
     st.markdown("### 📊 Статистика бази знань")
@@ -177,17 +287,14 @@ else:
         st.metric("📚 Всього захворювань", len(diseases))
 
     with col2:
-        unique_crops = len(set(d.get("crop", "") for d in diseases))
-        st.metric("🌾 Культур", unique_crops)
+        st.metric("🌾 Культур", len(diseases_by_crop))
 
     with col3:
         # Count diseases with symptoms
-        with_symptoms = sum(1 for d in diseases if d.get("symptoms"))
         st.metric("🔬 З симптомами", with_symptoms)
 
     with col4:
         # Count diseases with actions
-        with_actions = sum(1 for d in diseases if d.get("actions"))
         st.metric("💊 З планами дій", with_actions)
 
     st.divider()
@@ -198,104 +305,40 @@ else:
     if not diseases:
         st.info("🔍 Не знайдено захворювань за вказаними фільтрами")
     else:
-        # Group by crop for better organization
-        diseases_by_crop = {}
-        for disease in diseases:
-            crop = disease.get("crop", "unknown")
-            if crop not in diseases_by_crop:
-                diseases_by_crop[crop] = []
-            diseases_by_crop[crop].append(disease)
-
-        # Display each crop section
+        # A crop switched in the sidebar opens its section
+        if selected_crop != st.session_state.get("kb_last_crop"):
+            st.session_state["kb_last_crop"] = selected_crop
+            if selected_crop != "Всі":
+                st.session_state[f"kb_open_{selected_crop}"] = True
+
+        # Display each crop section. Collapsed sections build no widgets at
+        # all, and open ones render KB_PAGE_SIZE cards at a time.
         for crop, crop_diseases in sorted(diseases_by_crop.items()):
-            with st.expander(f"🌾 {crop.capitalize()} ({len(crop_diseases)} захворювань)", expanded=(selected_crop == crop)):
-                for disease in crop_diseases:
-                    name = disease.get("name", "Unknown")
-                    symptoms = disease.get("symptoms", [])
-                    visual_patterns = disease.get("visual_patterns", [])
-                    crops_supported = disease.get("crops_supported", [])
-                    stage_window = disease.get("stage_window", [])
-                    actions = disease.get("actions", {})
-
-                    with st.container(border=True):
-                        # Disease name and metadata
-                        col_title, col_meta = st.columns([3, 1])
-
-                        with col_title:
-                            st.markdown(f"### {name}")
-
-                        with col_meta:
-                            # Crops badges
-                            st.caption("**Культури:**")
-                            for crop_name in crops_supported:
-                                st.markdown(f'<span class="crop-badge">{crop_name}</span>', unsafe_allow_html=True)
-
-                        # Stage window
-                        if stage_window:
-                            st.markdown("**📅 Стадії росту (вікно уразливості):**")
-                            stage_names = {
-                                "seedling": "Сходи",
-                                "vegetative": "Вегетація",
-                                "flowering": "Цвітіння",
-                                "fruiting": "Плодоношення",
-                                "tubering": "Бульбоутворення",
-                                "tuber_development": "Розвиток бульб"
-                            }
-                            stages_translated = [stage_names.get(s, s) for s in stage_window]
-                            st.write(f"🌱 {', '.join(stages_translated)}")
-
-                        st.divider()
-
-                        # Symptoms
-                        if symptoms:
-                            st.markdown("**🔬 Симптоми:**")
-                            for symptom in symptoms:
-                                st.write(f"- {symptom}")
-
-                        # Visual patterns
-                        if visual_patterns:
-                            st.markdown("**👁️ Візуальні ознаки:**")
-                            for pattern in visual_patterns:
-                                st.write(f"- {pattern}")
-
-                        # Actions (plan)
-                        if actions:
-                            st.markdown("**📋 План дій:**")
-
-                            col_a1, col_a2 = st.columns(2)
-
-                            with col_a1:
-                                # Diagnostics
-                                diagnostics = actions.get("diagnostics", [])
-                                if diagnostics:
-                                    st.markdown("**🔬 Діагностичні заходи:**")
-                                    for diag in diagnostics:
-                                        st.write(f"- {diag}")
-
-                                # Agronomy
-                                agronomy = actions.get("agronomy", [])
-                                if agronomy:
-                                    st.markdown("**🌾 Агротехнічні заходи:**")
-                                    for agr in agronomy:
-                                        st.write(f"- {agr}")
-
-                            with col_a2:
-                                # Chemical control
-                                chemical = actions.get("chemical", [])
-                                if chemical:
-                                    st.markdown("**⚗️ Хімічний захист:**")
-                                    for chem in chemical:
-                                        st.write(f"- {chem}")
-
-                                # Biological control
-                                bio = actions.get("bio", [])
-                                if bio:
-                                    st.markdown("**🌿 Біологічний захист:**")
-                                    for b in bio:
-                                        st.write(f"- {b}")
-
-                        # File info
-                        st.caption(f"📄 Файл: `{disease.get('file_id', 'unknown')}.yaml`")
+            open_key = f"kb_open_{crop}"
+            shown_key = f"kb_shown_{crop}"
+            is_open = st.session_state.get(open_key, False)
+
+            st.button(
+                f"{'▾' if is_open else '▸'} 🌾 {crop.capitalize()} ({len(crop_diseases)} захворювань)",
+                key=f"kb_toggle_{crop}",
+                on_click=_toggle,
+                args=(open_key,),
+                use_container_width=True,
+            )
+            if not is_open:
+                continue
+
+            shown = st.session_state.get(shown_key, KB_PAGE_SIZE)
+            for disease in crop_diseases[:shown]:
+                render_disease_card(disease)
+
+            if len(crop_diseases) > shown:
+                st.button(
+                    f"Показати ще ({len(crop_diseases) - shown})",
+                    key=f"kb_more_{crop}",
+                    on_click=_show_more,
+                    args=(shown_key,),
+                )
 
 # Footer
 st.divider()